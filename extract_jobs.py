@@ -5,14 +5,192 @@ Extract job information from Indeed HTML files.
 
 import os
 import re
+import sys
+import contextlib
 import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
 from html import unescape
 
 
-def extract_job_from_html(html_content: str, filename: str) -> dict:
-    """Extract job information from a single HTML file."""
+# Optional fast parser backend
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# "auto" uses lxml when installed, otherwise BeautifulSoup's html.parser
+PARSER_BACKEND = os.getenv('EXTRACT_PARSER_BACKEND', 'auto')
+
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+ENTITY_PATTERN = re.compile(r'&(?:#([0-9]+);|#[xX]([0-9a-fA-F]+);|([a-zA-Z][-.a-zA-Z0-9]*);?|#)')
+
+
+class AmbiguousMarkup(Exception):
+    """Markup the lxml backend can't decode exactly like html.parser"""
+
+
+def decode_text(text: str) -> str:
+    """
+    Decode character references in a raw text node the way
+    BeautifulSoup + html.parser does, or raise AmbiguousMarkup.
+    """
+    if '&' not in text:
+        return text
+
+    def replace(m):
+        decimal, hexadecimal, name = m.groups()
+        if name is not None:
+            # Unknown names stay literal, minus any trailing ';'
+            return EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name, '&' + name)
+        if decimal is not None or hexadecimal is not None:
+            code = int(decimal) if decimal is not None else int(hexadecimal, 16)
+            # Control and windows-1252 ranges are decoded differently across versions
+            if 32 <= code < 127 or 160 <= code < 0xd800:
+                return chr(code)
+        raise AmbiguousMarkup(m.group(0))
+
+    return ENTITY_PATTERN.sub(replace, text)
+
+
+def normalize_string(text: str, preserve_whitespace: bool) -> str:
+    """BeautifulSoup collapses strings of pure ASCII whitespace"""
+    text = decode_text(text)
+    if not preserve_whitespace and not text.strip(ASCII_SPACES):
+        return '\n' if '\n' in text else ' '
+    return text
+
+
+class LxmlNode:
+    """
+    The small part of the BeautifulSoup Tag API that extract_job_from_html
+    uses, on top of an lxml element. Text and attributes are produced
+    exactly as html.parser would produce them.
+    """
+
+    def __init__(self, elem, preserve_whitespace=False):
+        self.elem = elem
+        self.preserve_whitespace = preserve_whitespace or elem.tag in PRESERVE_WHITESPACE_TAGS
+
+    def _contents(self):
+        """Children as bs4 sees them: strings and nodes, in order"""
+        elem = self.elem
+        if elem.text and elem.tag not in SKIP_TEXT_TAGS:
+            yield normalize_string(elem.text, self.preserve_whitespace)
+        for child in elem:
+            if isinstance(child.tag, str):
+                yield LxmlNode(child, self.preserve_whitespace)
+            if child.tail:
+                yield normalize_string(child.tail, self.preserve_whitespace)
+
+    def _strings(self):
+        for item in self._contents():
+            if isinstance(item, str):
+                yield item
+            else:
+                yield from item._strings()
+
+    @property
+    def string(self):
+        contents = list(self._contents())
+        # Comments count as children in bs4, so bail out if there are any
+        has_comments = any(not isinstance(child.tag, str) for child in self.elem)
+        if len(contents) != 1 or has_comments:
+            return None
+        child = contents[0]
+        return child if isinstance(child, str) else child.string
+
+    def get(self, key, default=None):
+        value = self.elem.get(key)
+        if value is None:
+            return default
+        return unescape(value)
+
+    def get_text(self, separator='', strip=False):
+        strings = self._strings()
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+    def _matches(self, attrs, string):
+        for key, expected in attrs.items():
+            value = self.get(key)
+            if value is None:
+                return False
+            if hasattr(expected, 'search'):
+                if not expected.search(value):
+                    return False
+            elif value != expected:
+                return False
+        if string is not None:
+            text = self.string
+            if text is None or not string.search(text):
+                return False
+        return True
+
+    def find_all(self, name, attrs=None, string=None, **kwargs):
+        attrs = dict(attrs or {}, **kwargs)
+        found = []
+        for elem in self.elem.iterdescendants(name):
+            node = LxmlNode(elem, self.preserve_whitespace)
+            if node._matches(attrs, string):
+                found.append(node)
+        return found
+
+    def find(self, name, attrs=None, string=None, **kwargs):
+        attrs = dict(attrs or {}, **kwargs)
+        for elem in self.elem.iterdescendants(name):
+            node = LxmlNode(elem, self.preserve_whitespace)
+            if node._matches(attrs, string):
+                return node
+        return None
+
+
+def make_soup(markup: str, backend: str):
+    """Parse markup with the given backend ("lxml" or "html.parser")"""
+    if backend == 'lxml':
+        if '\r' in markup or '\x00' in markup:
+            raise AmbiguousMarkup('line endings')
+        # Keep character references raw so they are decoded like html.parser does
+        return LxmlNode(lxml.html.document_fromstring(markup.replace('&', '&amp;')))
+    return BeautifulSoup(markup, 'html.parser')
+
+
+def resolve_backend(backend: str = None) -> str:
+    backend = backend or PARSER_BACKEND
+    if backend == 'auto':
+        return 'lxml' if HAS_LXML else 'html.parser'
+    if backend == 'lxml' and not HAS_LXML:
+        raise ImportError("lxml is not installed")
+    return backend
+
+
+def extract_job_from_html(html_content: str, filename: str, backend: str = None) -> dict:
+    """
+    Extract job information from a single HTML file.
+
+    backend picks the parser for the embedded job HTML; pages the lxml
+    backend can't reproduce exactly are parsed with html.parser instead.
+    """
+    backend = resolve_backend(backend)
+    if backend == 'lxml':
+        try:
+            return _extract_job(html_content, filename, 'lxml')
+        except AmbiguousMarkup:
+            pass
+    return _extract_job(html_content, filename, 'html.parser')
+
+
+def _extract_job(html_content: str, filename: str, backend: str) -> dict:
     # First extract meta tags using BeautifulSoup on the head section only
     head_match = re.search(r'<head>(.*?)</head>', html_content, re.DOTALL | re.IGNORECASE)
 
@@ -53,7 +231,7 @@ def extract_job_from_html(html_content: str, filename: str) -> dict:
         embedded_html = embedded_html.replace('\\"', '"')
         embedded_html = unescape(embedded_html)
 
-        inner_soup = BeautifulSoup(embedded_html, 'html.parser')
+        inner_soup = make_soup(embedded_html, backend)
 
         # Extract job title from header
         title_elem = inner_soup.find('h2', {'data-testid': 'jobsearch-JobInfoHeader-title'})
@@ -148,15 +326,83 @@ def clean_description(elem) -> str:
     return text.strip()
 
 
-def process_all_jobs(html_dir: str, output_dir: str) -> list:
-    """Process all HTML files in the directory and save individual JSON files."""
-    jobs = []
+# Bump when extract_job_from_html changes so every file is extracted again
+EXTRACTOR_VERSION = 1
+MANIFEST_FILE = '.extract_manifest.json'
+
+
+def file_sha256(path: Path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_manifest(output_path: Path) -> dict:
+    """
+    Load the extraction manifest from the output directory.
+    Returns an empty manifest if it is missing or from another extractor version.
+    """
+    manifest_path = output_path / MANIFEST_FILE
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('extractor_version') == EXTRACTOR_VERSION:
+            return manifest
+        print(f"Extractor version changed ({manifest.get('extractor_version')} -> {EXTRACTOR_VERSION}), rebuilding all")
+    return {'extractor_version': EXTRACTOR_VERSION, 'files': {}}
+
+
+def save_manifest(output_path: Path, manifest: dict):
+    manifest_path = output_path / MANIFEST_FILE
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def process_html_file(html_file: Path, output_path: Path) -> tuple:
+    """
+    Extract one HTML file and save its JSON file.
+    Returns (filename, job_data, error, sha256); error is None on success.
+    """
+    try:
+        with open(html_file, 'rb') as f:
+            raw = f.read()
+        content = raw.decode('utf-8')
+
+        job_data = extract_job_from_html(content, html_file.name)
+
+        # Save individual JSON file
+        json_path = output_path / (html_file.stem + '.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(job_data, f, indent=2, ensure_ascii=False)
+
+        return html_file.name, job_data, None, hashlib.sha256(raw).hexdigest()
+    except Exception as e:
+        return html_file.name, None, f"{type(e).__name__}: {e}", None
+
+
+def iter_jobs(html_dir: str, output_dir: str, workers: int = 1, chunksize: int = 8,
+              force: bool = False, include_unchanged: bool = False, dropped: list = None):
+    """
+    Process new or changed HTML files in the directory, save individual JSON
+    files, and yield (job_data, changed) in file order as results arrive.
+
+    A manifest in the output directory records sha256, size and mtime per
+    source file; files that match it are skipped. With include_unchanged the
+    skipped jobs are yielded too, read back from their JSON files. With
+    workers > 1 the files are spread over a process pool in chunks of
+    `chunksize`. Only one job is held in memory at a time.
+
+    Sources that were removed or now fail to extract lose their JSON file
+    and manifest entry; their names are appended to `dropped` if given.
+    """
+    errors = []
     html_path = Path(html_dir)
     output_path = Path(output_dir)
 
     if not html_path.exists():
         print(f"Directory not found: {html_dir}")
-        return jobs
+        return
 
     # Create output directory if it doesn't exist
     output_path.mkdir(parents=True, exist_ok=True)
@@ -164,51 +410,236 @@ def process_all_jobs(html_dir: str, output_dir: str) -> list:
     html_files = sorted(html_path.glob('*.html'))
     print(f"Found {len(html_files)} HTML files")
 
-    for html_file in html_files:
-        try:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            job_data = extract_job_from_html(content, html_file.name)
-            jobs.append(job_data)
+    manifest = {'extractor_version': EXTRACTOR_VERSION, 'files': {}} if force else load_manifest(output_path)
+    known = manifest['files']
+    stats = {f.name: f.stat() for f in html_files}
 
-            # Save individual JSON file
-            json_filename = html_file.stem + '.json'
-            json_path = output_path / json_filename
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(job_data, f, indent=2, ensure_ascii=False)
+    # Drop sources that no longer exist, along with their JSON files
+    for name in sorted(set(known) - set(stats)):
+        del known[name]
+        (output_path / (Path(name).stem + '.json')).unlink(missing_ok=True)
+        if dropped is not None:
+            dropped.append(name)
 
-            print(f"  Processed: {html_file.name} -> {json_filename}")
-        except Exception as e:
-            print(f"  Error processing {html_file.name}: {e}")
-
-    return jobs
+    todo = []
+    for html_file in html_files:
+        st = stats[html_file.name]
+        entry = known.get(html_file.name)
+        if entry and (output_path / (html_file.stem + '.json')).exists():
+            if entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+                continue
+            # Touched but not modified
+            if entry['size'] == st.st_size and entry['sha256'] == file_sha256(html_file):
+                entry['mtime_ns'] = st.st_mtime_ns
+                continue
+        todo.append(html_file)
+
+    print(f"  {len(todo)} new or changed, {len(html_files) - len(todo)} unchanged")
+
+    if workers > 1 and len(todo) > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(process_html_file, todo,
+                               [output_path] * len(todo), chunksize=chunksize)
+    else:
+        executor = None
+        results = (process_html_file(f, output_path) for f in todo)
+
+    todo_names = {f.name for f in todo}
+    try:
+        for html_file in html_files:
+            if html_file.name not in todo_names:
+                if include_unchanged:
+                    with open(output_path / (html_file.stem + '.json'), 'r', encoding='utf-8') as f:
+                        yield json.load(f), False
+                continue
+
+            name, job_data, error, sha256 = next(results)
+            if error:
+                errors.append((name, error))
+                # Don't leave the last good extraction of a file that now fails
+                (output_path / (Path(name).stem + '.json')).unlink(missing_ok=True)
+                if known.pop(name, None) is not None and dropped is not None:
+                    dropped.append(name)
+                print(f"  Error processing {name}: {error}")
+            else:
+                st = stats[name]
+                known[name] = {'sha256': sha256, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+                print(f"  Processed: {name} -> {Path(name).stem}.json")
+                yield job_data, True
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        save_manifest(output_path, manifest)
+
+    if errors:
+        print(f"\n=== {len(errors)} file(s) failed ===")
+        for name, error in errors:
+            print(f"- {name}: {error}")
+
+
+def process_all_jobs(html_dir: str, output_dir: str, workers: int = 1, chunksize: int = 8,
+                     force: bool = False) -> list:
+    """
+    Process new or changed HTML files in the directory and save individual JSON files.
+    Returns the jobs extracted in this run.
+    """
+    return [job for job, _ in iter_jobs(html_dir, output_dir, workers, chunksize, force)]
+
+
+def write_combined(output_dir: str, combined_file: str):
+    """
+    Write every extracted job in the manifest to one JSON array.
+
+    The individual JSON files are spliced in as text (indented one level),
+    so unchanged jobs are never decoded or re-serialized. The result is the
+    same as json.dump(jobs, f, indent=2, ensure_ascii=False).
+    """
+    output_path = Path(output_dir)
+    names = sorted(load_manifest(output_path)['files'])
+    tmp_file = combined_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as out:
+        out.write('[')
+        for i, name in enumerate(names):
+            with open(output_path / (Path(name).stem + '.json'), 'r', encoding='utf-8') as f:
+                text = f.read()
+            out.write(',\n  ' if i else '\n  ')
+            out.write(text.replace('\n', '\n  '))
+        out.write('\n]' if names else ']')
+    os.replace(tmp_file, combined_file)
+    return len(names)
+
+
+def load_html_corpus(html_dir: str) -> list:
+    corpus = []
+    for html_file in sorted(Path(html_dir).glob('*.html')):
+        with open(html_file, 'r', encoding='utf-8') as f:
+            corpus.append((html_file.name, f.read()))
+    return corpus
+
+
+def check_parity(html_dir: str) -> bool:
+    """Check that the lxml backend produces the same job_data as html.parser on every page"""
+    corpus = load_html_corpus(html_dir)
+    mismatches = 0
+    fallbacks = 0
+    for name, content in corpus:
+        expected = _extract_job(content, name, 'html.parser')
+        try:
+            actual = _extract_job(content, name, 'lxml')
+        except AmbiguousMarkup:
+            fallbacks += 1
+            continue
+        if actual != expected:
+            mismatches += 1
+            fields = [k for k in expected if expected[k] != actual[k]]
+            print(f"  Mismatch in {name}: {', '.join(fields)}")
+
+    print(f"Parity: {len(corpus) - mismatches - fallbacks}/{len(corpus)} identical, "
+          f"{fallbacks} fall back to html.parser, {mismatches} mismatched")
+    return mismatches == 0
+
+
+def benchmark_backends(html_dir: str, rounds: int = 3):
+    """Time extract_job_from_html per page for each available backend"""
+    corpus = load_html_corpus(html_dir)
+    backends = ['html.parser'] + (['lxml'] if HAS_LXML else [])
+    print(f"Benchmarking {len(corpus)} pages, best of {rounds} rounds")
+    for backend in backends:
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for name, content in corpus:
+                extract_job_from_html(content, name, backend)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"  {backend:<12} {best * 1000 / len(corpus):7.2f} ms/page  ({best:.2f} s total)")
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Extract job data from Indeed HTML files')
     # Directory containing the HTML files
-    html_dir = '/Users/iuser/Desktop/未命名文件夹/CV/indeed_jobs_html'
+    parser.add_argument('--html-dir', default='/Users/iuser/Desktop/未命名文件夹/CV/indeed_jobs_html')
     # Directory for individual JSON files
-    output_dir = '/Users/iuser/Desktop/未命名文件夹/CV/indeed_jobs_json'
-
-    print("Extracting job data from Indeed HTML files...")
-    jobs = process_all_jobs(html_dir, output_dir)
-
-    # Also save combined JSON for convenience
-    combined_file = '/Users/iuser/Desktop/未命名文件夹/CV/extracted_jobs.json'
-    with open(combined_file, 'w', encoding='utf-8') as f:
-        json.dump(jobs, f, indent=2, ensure_ascii=False)
-
-    print(f"\nExtracted {len(jobs)} jobs")
-    print(f"  - Individual JSON files saved to: {output_dir}")
-    print(f"  - Combined JSON saved to: {combined_file}")
-
-    # Print summary
-    print("\n=== Summary ===")
-    for job in jobs[:5]:
-        print(f"- {job['job_title']} @ {job['company']} ({job['location']})")
-    if len(jobs) > 5:
-        print(f"  ... and {len(jobs) - 5} more")
+    parser.add_argument('--output-dir', default='/Users/iuser/Desktop/未命名文件夹/CV/indeed_jobs_json')
+    parser.add_argument('--combined', default='/Users/iuser/Desktop/未命名文件夹/CV/extracted_jobs.json',
+                        help='Combined JSON output file')
+    parser.add_argument('--workers', '-w', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true',
+                        help='Ignore the manifest and extract every file again')
+    parser.add_argument('--ndjson', default=None,
+                        help='Also stream every job as one JSON object per line to this file ("-" for stdout)')
+    parser.add_argument('--backend', choices=['auto', 'lxml', 'html.parser'], default=None,
+                        help='HTML parser backend (default: EXTRACT_PARSER_BACKEND or auto)')
+    parser.add_argument('--check-parity', action='store_true',
+                        help='Compare lxml and html.parser output on every page and exit')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Time each parser backend per page and exit')
+    args = parser.parse_args()
+
+    if args.check_parity:
+        raise SystemExit(0 if check_parity(args.html_dir) else 1)
+    if args.benchmark:
+        benchmark_backends(args.html_dir)
+        return
+    if args.backend:
+        # Picked up by the worker processes too (inherited environment)
+        os.environ['EXTRACT_PARSER_BACKEND'] = args.backend
+        global PARSER_BACKEND
+        PARSER_BACKEND = args.backend
+
+    html_dir = args.html_dir
+    output_dir = args.output_dir
+
+    # With --ndjson - the job stream owns stdout, so progress goes to stderr
+    ndjson_out = None
+    if args.ndjson == '-':
+        ndjson_out = sys.stdout
+        log_stream = contextlib.redirect_stdout(sys.stderr)
+    else:
+        if args.ndjson:
+            ndjson_out = open(args.ndjson, 'w', encoding='utf-8')
+        log_stream = contextlib.nullcontext()
+
+    with log_stream:
+        print("Extracting job data from Indeed HTML files...")
+        changed = 0
+        preview = []
+        dropped = []
+        jobs = iter_jobs(html_dir, output_dir, workers=args.workers, force=args.force,
+                         include_unchanged=ndjson_out is not None, dropped=dropped)
+        for job, is_changed in jobs:
+            if ndjson_out is not None:
+                ndjson_out.write(json.dumps(job, ensure_ascii=False) + '\n')
+                ndjson_out.flush()
+            if is_changed:
+                changed += 1
+                if len(preview) < 5:
+                    preview.append(job)
+        if ndjson_out is not None and ndjson_out is not sys.stdout:
+            ndjson_out.close()
+
+        # Also save combined JSON for convenience (rebuilt whenever the manifest changed)
+        combined_file = args.combined
+        if changed or dropped or args.force or not os.path.exists(combined_file):
+            total = write_combined(output_dir, combined_file)
+        else:
+            total = len(load_manifest(Path(output_dir))['files'])
+
+        print(f"\nExtracted {changed} new or changed jobs ({total} total)")
+        if dropped:
+            print(f"  - Dropped {len(dropped)} removed or failing jobs")
+        print(f"  - Individual JSON files saved to: {output_dir}")
+        print(f"  - Combined JSON saved to: {combined_file}")
+        if args.ndjson:
+            print(f"  - NDJSON stream written to: {'stdout' if args.ndjson == '-' else args.ndjson}")
+
+        # Print summary
+        print("\n=== Summary ===")
+        for job in preview:
+            print(f"- {job['job_title']} @ {job['company']} ({job['location']})")
+        if changed > 5:
+            print(f"  ... and {changed - 5} more")
 
 
 if __name__ == '__main__':
@@ -5,28 +5,39 @@ Batch Resume Generator with Tracking
 - Track all generated resumes in CSV
 """
 
-import subprocess
+import asyncio
 import random
 import os
 import json
 import csv
+import hashlib
 import argparse
 import glob
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from faker import Faker
 
-from llm_client import call_llm_json
+from llm_client import set_max_concurrency, write_batch_requests, read_batch_results
 from generate_cv_llm import (
-    parse_job_requirements,
-    generate_experience_with_ai,
-    generate_experience_without_ai,
-    generate_project_with_ai,
-    generate_project_without_ai,
-    generate_skills,
-    generate_position,
-    generate_achievement,
+    aparse_job_requirements,
+    agenerate_experience_with_ai,
+    agenerate_experience_without_ai,
+    agenerate_project_with_ai,
+    agenerate_project_without_ai,
+    agenerate_skills,
+    agenerate_position,
+    agenerate_achievement,
+    agenerate_treatment_fused,
+    agenerate_shared_fused,
+    check_treatment,
+    check_shared,
+    mentions_ai,
+    section_request,
     SKILL_BIASES,
 )
+from task_graph import TaskGraph
+from latex_compiler import build_pdf, build_pdf_batch, output_pages, COMPILE_WORKERS
+from resume_template import generate_latex
 
 fake = Faker('en_US')
 
@@ -34,28 +45,78 @@ fake = Faker('en_US')
 # Job Index System
 # ============================================================
 
+JOBS_DIR = "indeed_jobs_json"
+JOB_CATALOG_FILE = "job_catalog.json"
+
+_job_index = None  # loaded once per process
+
+
 def get_all_jobs():
     """Get all job files sorted by name"""
-    jobs_dir = "indeed_jobs_json"
-    job_files = sorted(glob.glob(os.path.join(jobs_dir, "*.json")))
+    job_files = sorted(glob.glob(os.path.join(JOBS_DIR, "*.json")))
     return job_files
 
 
+def scan_job_files():
+    """Stat every job file (no parsing). Returns sorted [(name, mtime_ns, size)]"""
+    files = []
+    with os.scandir(JOBS_DIR) as it:
+        for entry in it:
+            if entry.name.endswith('.json') and entry.is_file():
+                st = entry.stat()
+                files.append((entry.name, st.st_mtime_ns, st.st_size))
+    files.sort()
+    return files
+
+
 def load_job_index():
-    """Load or create job index"""
-    job_files = get_all_jobs()
-    jobs = []
-    for i, path in enumerate(job_files, 1):
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        jobs.append({
-            'index': i,
-            'path': path,
-            'job_title': data.get('job_title', 'Unknown'),
-            'company': data.get('company', 'Unknown'),
-            'location': data.get('location', 'Unknown'),
-        })
-    return jobs
+    """
+    Load job index from the on-disk catalogue
+
+    The catalogue stores (name, mtime, size, title, company, location) per
+    file. Only files that are new or changed since it was written are
+    parsed again; otherwise building the index costs one stat per file.
+    """
+    global _job_index
+    if _job_index is not None:
+        return _job_index
+
+    catalog = {}
+    if os.path.exists(JOB_CATALOG_FILE):
+        try:
+            with open(JOB_CATALOG_FILE, 'r', encoding='utf-8') as f:
+                catalog = {row[0]: row for row in json.load(f)['files']}
+        except (json.JSONDecodeError, KeyError, IndexError):
+            catalog = {}
+
+    rows = []
+    changed = False
+    for name, mtime_ns, size in scan_job_files():
+        row = catalog.get(name)
+        if row is None or row[1] != mtime_ns or row[2] != size:
+            with open(os.path.join(JOBS_DIR, name), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            row = [name, mtime_ns, size,
+                   data.get('job_title', 'Unknown'),
+                   data.get('company', 'Unknown'),
+                   data.get('location', 'Unknown')]
+            changed = True
+        rows.append(row)
+
+    if changed or len(rows) != len(catalog):
+        tmp_file = JOB_CATALOG_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'jobs_dir': JOBS_DIR, 'files': rows}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, JOB_CATALOG_FILE)
+
+    _job_index = [{
+        'index': i,
+        'path': os.path.join(JOBS_DIR, row[0]),
+        'job_title': row[3],
+        'company': row[4],
+        'location': row[5],
+    } for i, row in enumerate(rows, 1)]
+    return _job_index
 
 
 def list_jobs(start=1, count=20):
@@ -93,6 +154,105 @@ def get_job_by_index(index):
         raise ValueError(f"Job index {index} out of range (1-{len(jobs)})")
 
 
+# ============================================================
+# Precomputed Job Requirements
+# ============================================================
+
+JOB_REQUIREMENTS_FILE = "job_requirements.json"
+
+
+def description_hash(job_desc):
+    return hashlib.sha256(job_desc.encode('utf-8')).hexdigest()
+
+
+def load_requirements_store():
+    """
+    Load the precomputed job requirements store
+
+    Layout:
+        by_hash:  {description hash: job_info}
+        by_index: {job index: {"path": ..., "desc_hash": ...}}
+    """
+    if os.path.exists(JOB_REQUIREMENTS_FILE):
+        with open(JOB_REQUIREMENTS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'by_hash': {}, 'by_index': {}}
+
+
+def save_requirements_store(store):
+    tmp_file = JOB_REQUIREMENTS_FILE + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(store, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, JOB_REQUIREMENTS_FILE)
+
+
+async def aprecompute_requirements():
+    """Parse every job whose description is new or changed since the last run"""
+    store = load_requirements_store()
+    jobs = load_job_index()
+
+    by_index = {}
+    pending = {}  # desc hash -> description
+    for job in jobs:
+        with open(job['path'], 'r', encoding='utf-8') as f:
+            job_desc = json.load(f).get('full_description', '') or ''
+        desc_hash = description_hash(job_desc)
+        by_index[str(job['index'])] = {'path': job['path'], 'desc_hash': desc_hash}
+        if job_desc and desc_hash not in store['by_hash']:
+            pending[desc_hash] = job_desc
+
+    print(f"{len(jobs)} jobs, {len(pending)} new or changed descriptions to parse")
+
+    done = 0
+    failed = 0
+
+    async def parse_one(desc_hash, job_desc):
+        nonlocal done, failed
+        try:
+            store['by_hash'][desc_hash] = await aparse_job_requirements(job_desc)
+            done += 1
+        except Exception as e:
+            failed += 1
+            print(f"  Error parsing {desc_hash[:12]}: {e}")
+            return
+        print(f"  [{done}/{len(pending)}] {desc_hash[:12]}")
+
+    await asyncio.gather(*(parse_one(h, d) for h, d in pending.items()))
+
+    # Drop entries for descriptions no longer in the corpus
+    live = {entry['desc_hash'] for entry in by_index.values()}
+    store['by_hash'] = {h: info for h, info in store['by_hash'].items() if h in live}
+    store['by_index'] = by_index
+    save_requirements_store(store)
+
+    print(f"Parsed {done} jobs ({failed} failed), store: {JOB_REQUIREMENTS_FILE}")
+    return store
+
+
+def precompute_requirements():
+    return asyncio.run(aprecompute_requirements())
+
+
+def lookup_job_requirements(job_desc):
+    """Job requirements from the precomputed store, or None if they aren't there"""
+    return load_requirements_store()['by_hash'].get(description_hash(job_desc))
+
+
+async def aget_job_requirements(job_index, job_path, job_desc):
+    """Look up job requirements in the store, parsing (and storing) them on a miss"""
+    job_info = lookup_job_requirements(job_desc)
+    if job_info is not None:
+        return job_info, True
+    desc_hash = description_hash(job_desc)
+
+    job_info = await aparse_job_requirements(job_desc)
+    store = load_requirements_store()
+    store['by_hash'][desc_hash] = job_info
+    store['by_index'][str(job_index)] = {'path': job_path, 'desc_hash': desc_hash}
+    save_requirements_store(store)
+    return job_info, False
+
+
 # ============================================================
 # Data Loading
 # ============================================================
@@ -170,6 +330,31 @@ def init_tracking():
             ])
 
 
+def tracking_person_id(job_index, person, timestamp):
+    return f"job{job_index}_p{person['person_num']}_{timestamp}"
+
+
+def remove_tracking_records(person_ids):
+    """Drop the tracking rows of these people; returns how many were removed"""
+    if not os.path.exists(TRACKING_FILE):
+        return 0
+    with open(TRACKING_FILE, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    header, records = rows[0], rows[1:]
+    column = header.index('person_id')
+    kept = [row for row in records if row[column] not in person_ids]
+    if len(kept) == len(records):
+        return 0
+
+    tmp_file = TRACKING_FILE + '.tmp'
+    with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(kept)
+    os.replace(tmp_file, TRACKING_FILE)
+    return len(records) - len(kept)
+
+
 def add_tracking_record(record):
     """Add a record to tracking CSV"""
     init_tracking()
@@ -237,253 +422,107 @@ def show_tracking_summary():
 # Resume Generation
 # ============================================================
 
-def escape_latex(text):
-    replacements = {
-        '%': '\\%', '$': '\\$', '&': '\\&', '#': '\\#',
-        '_': '\\_', '{': '\\{', '}': '\\}',
-    }
-    for old, new in replacements.items():
-        text = str(text).replace(old, new)
-    return text
+def compile_pdf(latex_content, pdf_file, keep_tex=True):
+    """
+    Compile LaTeX to PDF in a scratch directory; only the PDF (and .tex) land next to pdf_file
 
+    Returns (ok, pages); pages is read from the engine output, or None if unknown
+    """
+    pdf_ok, results = build_pdf(latex_content, pdf_file, keep_tex=keep_tex)
+    return pdf_ok, output_pages(results, pdf_file) if pdf_ok else None
 
-def generate_latex(data):
-    """Generate LaTeX content from resume data"""
 
-    education_tex = ""
-    for edu in data["education"]:
-        education_tex += f"""    \\resumeSubheading
-      {{{escape_latex(edu["school"])}}}{{{escape_latex(edu["score"])}}}
-      {{{escape_latex(edu["degree"])}}}{{{edu["year"]}}}
-"""
+class CompileBatcher:
+    """
+    Collects finished resumes and typesets them batch_size at a time
 
-    experience_tex = ""
-    for exp in data["experiences"]:
-        items = "\n".join([f"    \\item {{{escape_latex(item)}}}" for item in exp["items"]])
-        experience_tex += f"""    \\resumeSubheading
-      {{{escape_latex(exp["company"])}}}{{{escape_latex(exp["city"])}}}
-      {{{escape_latex(exp["role"])}}}{{{exp["dates"]}}}
-      \\vspace{{-2.0mm}}
-      \\resumeItemListStart
-{items}
-    \\resumeItemListEnd
-"""
+    Each batch is one pdflatex run (build_pdf_batch) on the compile pool.
+    The last, partial batch is sent once all `total` resumes are in.
+    """
 
-    projects_tex = ""
-    for proj in data["projects"]:
-        items = "\n".join([f"        \\item {{{escape_latex(item)}}}" for item in proj["items"]])
-        projects_tex += f"""    \\resumeProject
-      {{{escape_latex(proj["name"])}}}{{{escape_latex(proj["description"])}}}
-      {{{proj["dates"]}}}
-      {{}}
-      \\resumeItemListStart
-{items}
-    \\resumeItemListEnd
-    \\vspace{{-2mm}}
-"""
+    def __init__(self, pool, total, batch_size, keep_tex=True):
+        self.pool = pool
+        self.total = total
+        self.batch_size = batch_size
+        self.keep_tex = keep_tex
+        self.submitted = 0
+        self.pending = []  # (latex_content, pdf_file, future)
+        self.running = set()  # keep batch tasks referenced until they finish
+
+    async def compile(self, latex_content, pdf_file):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((latex_content, pdf_file, future))
+        self.submitted += 1
+        if len(self.pending) >= self.batch_size or self.submitted == self.total:
+            batch, self.pending = self.pending, []
+            task = asyncio.ensure_future(self._run(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+        return await future
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        documents = [(latex_content, pdf_file) for latex_content, pdf_file, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.pool, build_pdf_batch, documents, self.keep_tex)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
 
-    positions_tex = ""
-    for pos in data["positions"]:
-        positions_tex += f"""\\resumePOR{{{escape_latex(pos["title"])}, }}
-    {{{escape_latex(pos["org"])}}}
-    {{{pos["tenure"]}}}
-"""
 
-    achievements_tex = ""
-    for ach in data["achievements"]:
-        achievements_tex += f"""\\resumePOR{{{escape_latex(ach["title"])} }}
-    {{{escape_latex(ach["desc"])}}}
-    {{{ach["date"]}}}
-"""
+# ============================================================
+# One-Page Fitting
+# ============================================================
 
-    latex_content = r"""%-------------------------
-% Auto-Generated Resume (LLM-Enhanced)
-%------------------------
-
-\documentclass[a4paper,11pt]{article}
-\usepackage{latexsym}
-\usepackage{xcolor}
-\usepackage{float}
-\usepackage{ragged2e}
-\usepackage[empty]{fullpage}
-\usepackage{wrapfig}
-\usepackage{lipsum}
-\usepackage{tabularx}
-\usepackage{titlesec}
-\usepackage{geometry}
-\usepackage{marvosym}
-\usepackage{verbatim}
-\usepackage{enumitem}
-\usepackage[hidelinks]{hyperref}
-\usepackage{fancyhdr}
-\usepackage{fontawesome5}
-\usepackage{multicol}
-\usepackage{graphicx}
-\usepackage{cfr-lm}
-\usepackage[T1]{fontenc}
-\setlength{\multicolsep}{0pt}
-\pagestyle{fancy}
-\fancyhf{}
-\fancyfoot{}
-\renewcommand{\headrulewidth}{0pt}
-\renewcommand{\footrulewidth}{0pt}
-\geometry{left=1.4cm, top=0.8cm, right=1.2cm, bottom=1cm}
-
-\usepackage[most]{tcolorbox}
-\tcbset{
-	frame code={}
-	center title,
-	left=0pt,
-	right=0pt,
-	top=0pt,
-	bottom=0pt,
-	colback=gray!20,
-	colframe=white,
-	width=\dimexpr\textwidth\relax,
-	enlarge left by=-2mm,
-	boxsep=4pt,
-	arc=0pt,outer arc=0pt,
-}
-
-\urlstyle{same}
-\raggedright
-\setlength{\tabcolsep}{0in}
-
-\titleformat{\section}{
-  \vspace{-4pt}\scshape\raggedright\large
-}{}{0em}{}[\color{black}\titlerule \vspace{-7pt}]
-
-\newcommand{\resumeItem}[2]{
-  \item{\textbf{#1}{\hspace{0.5mm}#2 \vspace{-0.5mm}}}
-}
-
-\newcommand{\resumePOR}[3]{
-\vspace{0.5mm}\item
-    \begin{tabular*}{0.97\textwidth}[t]{l@{\extracolsep{\fill}}r}
-        \textbf{#1}\hspace{0.3mm}#2 & \textit{\small{#3}}
-    \end{tabular*}
-    \vspace{-2mm}
-}
-
-\newcommand{\resumeSubheading}[4]{
-\vspace{0.5mm}\item
-    \begin{tabular*}{0.98\textwidth}[t]{l@{\extracolsep{\fill}}r}
-        \textbf{#1} & \textit{\footnotesize{#4}} \\
-        \textit{\footnotesize{#3}} &  \footnotesize{#2}\\
-    \end{tabular*}
-    \vspace{-2.4mm}
-}
-
-\newcommand{\resumeProject}[4]{
-\vspace{0.5mm}\item
-    \begin{tabular*}{0.98\textwidth}[t]{l@{\extracolsep{\fill}}r}
-        \textbf{#1} & \textit{\footnotesize{#3}} \\
-        \footnotesize{\textit{#2}} & \footnotesize{#4}
-    \end{tabular*}
-    \vspace{-2.4mm}
-}
-
-\newcommand{\resumeSubItem}[2]{\resumeItem{#1}{#2}\vspace{-4pt}}
-\renewcommand{\labelitemi}{$\vcenter{\hbox{\tiny$\bullet$}}$}
-
-\newcommand{\resumeSubHeadingListStart}{\begin{itemize}[leftmargin=*,labelsep=0mm]}
-\newcommand{\resumeHeadingSkillStart}{\begin{itemize}[leftmargin=*,itemsep=1.7mm, rightmargin=2ex]}
-\newcommand{\resumeItemListStart}{\begin{justify}\begin{itemize}[leftmargin=3ex, rightmargin=2ex, noitemsep,labelsep=1.2mm,itemsep=0mm]\small}
-\newcommand{\resumeSubHeadingListEnd}{\end{itemize}\vspace{2mm}}
-\newcommand{\resumeHeadingSkillEnd}{\end{itemize}\vspace{-2mm}}
-\newcommand{\resumeItemListEnd}{\end{itemize}\end{justify}\vspace{-2mm}}
-
-\newcommand{\cvsection}[1]{%
-\vspace{2mm}
-\begin{tcolorbox}
-    \textbf{\large #1}
-\end{tcolorbox}
-    \vspace{-4mm}
-}
-
-\newcolumntype{L}{>{\raggedright\arraybackslash}X}%
-\newcolumntype{R}{>{\raggedleft\arraybackslash}X}%
-\newcolumntype{C}{>{\centering\arraybackslash}X}%
-
-\begin{document}
-\fontfamily{cmr}\selectfont
-
-\parbox{\dimexpr\linewidth\relax}{
-\begin{tabularx}{\linewidth}{L r} \\
-  \textbf{\Large """ + escape_latex(data["name"]) + r"""} & {\raisebox{0.0\height}{\footnotesize \faPhone}\ +1-""" + data["phone"] + r"""}\\
-  {""" + escape_latex(data["location"]) + r"""} & \href{mailto:""" + data["email"] + r"""}{\raisebox{0.0\height}{\footnotesize \faEnvelope}\ {""" + data["email"] + r"""}} \\
-  """ + escape_latex(data["course"]) + r""" & \href{https://github.com/}{\raisebox{0.0\height}{\footnotesize \faGithub}\ {GitHub Profile}} \\
-  {""" + escape_latex(data["university"]) + r"""} & \href{https://linkedin.com/}{\raisebox{0.0\height}{\footnotesize \faLinkedin}\ {LinkedIn Profile}}
-\end{tabularx}
-}
-
-\section{\textbf{Education}}
-  \resumeSubHeadingListStart
-""" + education_tex + r"""  \resumeSubHeadingListEnd
-\vspace{-5.5mm}
-
-\section{\textbf{Experience}}
-  \resumeSubHeadingListStart
-""" + experience_tex + r"""  \resumeSubHeadingListEnd
-\vspace{-8.5mm}
-
-\section{\textbf{Personal Projects}}
-\resumeSubHeadingListStart
-""" + projects_tex + r"""\resumeSubHeadingListEnd
-\vspace{-5.5mm}
-
-\section{\textbf{Technical Skills and Interests}}
- \begin{itemize}[leftmargin=0.05in, label={}]
-    \small{\item{
-     \textbf{Languages}{: """ + escape_latex(data["skills"]["languages"]) + r"""} \\
-     \textbf{Developer Tools}{: """ + escape_latex(data["skills"]["tools"]) + r"""} \\
-     \textbf{Frameworks}{: """ + escape_latex(data["skills"]["frameworks"]) + r"""} \\
-     \textbf{Cloud/Databases}{: """ + escape_latex(data["skills"]["databases"]) + r"""} \\
-     \textbf{Soft Skills}{: """ + escape_latex(data["skills"]["soft_skills"]) + r"""} \\
-     \textbf{Coursework}{: """ + escape_latex(data["skills"]["coursework"]) + r"""} \\
-     \textbf{Areas of Interest}{: """ + escape_latex(data["skills"]["interests"]) + r"""} \\
-    }}
- \end{itemize}
- \vspace{-16pt}
-
-\section{\textbf{Positions of Responsibility}}
-\vspace{-0.4mm}
-\resumeSubHeadingListStart
-""" + positions_tex + r"""\resumeSubHeadingListEnd
-\vspace{-5mm}
-
-\section{\textbf{Achievements}}
-\vspace{-0.4mm}
-\resumeSubHeadingListStart
-""" + achievements_tex + r"""\resumeSubHeadingListEnd
-\vspace{-5mm}
-\setlength{\footskip}{4.08003pt}
-
-\end{document}
-"""
-    return latex_content
+# Give up on fitting a resume onto one page after this many trims
+MAX_TRIM_ROUNDS = 6
 
+# Words a shortened bullet shouldn't end on
+TRAILING_WORDS = {'and', 'or', 'with', 'to', 'of', 'the', 'a', 'an', 'by', 'for', 'in', 'on', 'across', 'using'}
 
-def compile_pdf(tex_file):
-    """Compile LaTeX to PDF"""
-    output_dir = os.path.dirname(tex_file) or "."
 
-    subprocess.run(
-        ["pdflatex", "-interaction=nonstopmode", f"-output-directory={output_dir}", tex_file],
-        capture_output=True, text=True
-    )
-    subprocess.run(
-        ["pdflatex", "-interaction=nonstopmode", f"-output-directory={output_dir}", tex_file],
-        capture_output=True, text=True
-    )
+def shorten_bullet(text, ratio=0.75):
+    """Cut text to about ratio of its length, at a clause boundary if possible, else a word"""
+    limit = int(len(text) * ratio)
+    cut = max(text.rfind(sep, 0, limit) for sep in ['; ', ', ', ' - '])
+    if cut < len(text) // 2:
+        cut = text.rfind(' ', 0, limit)
+    if cut <= 0:
+        return text
+    words = text[:cut].rstrip(' ,;:-').split(' ')
+    while len(words) > 1 and words[-1].lower() in TRAILING_WORDS:
+        words.pop()
+    return ' '.join(words).rstrip(' ,;:-') + '.'
+
+
+def trim_longest_bullet(resume_data):
+    """
+    Shorten the longest experience/project bullet in place
 
-    pdf_file = tex_file.replace(".tex", ".pdf")
-    if os.path.exists(pdf_file):
-        for ext in [".aux", ".log", ".out"]:
-            try:
-                os.remove(tex_file.replace(".tex", ext))
-            except FileNotFoundError:
-                pass
+    A trim that would drop a section's only AI mention is skipped in favour
+    of the next longest bullet, so the treatment survives one-page fitting.
+    Returns False if there was nothing left to shorten.
+    """
+    bullets = [
+        (len(item), section, i)
+        for section in resume_data['experiences'] + resume_data['projects']
+        for i, item in enumerate(section['items'])
+    ]
+    for _, section, i in sorted(bullets, key=lambda b: b[0], reverse=True):
+        original = section['items'][i]
+        shortened = shorten_bullet(original)
+        if shortened == original:
+            continue
+        had_ai = mentions_ai(section)
+        section['items'][i] = shortened
+        if had_ai and not mentions_ai(section):
+            section['items'][i] = original
+            continue
         return True
     return False
 
@@ -492,194 +531,321 @@ def compile_pdf(tex_file):
 # Batch Generation
 # ============================================================
 
-def generate_batch(job_index, count, tier='top', output_dir='resumes'):
-    """
-    Generate batch of resumes for one job
+# Three treatment groups:
+# - control: No AI content anywhere
+# - ai_course: AI only in Experience
+# - ai_project: AI only in Project
+TREATMENT_GROUPS = [
+    {"name": "control", "exp_ai": False, "proj_ai": False},
+    {"name": "ai_course", "exp_ai": True, "proj_ai": False},
+    {"name": "ai_project", "exp_ai": False, "proj_ai": True},
+]
+
+
+def generate_person(job_info, tier, person_num):
+    """Generate shared personal info for one person (no API needed)"""
+    tier_universities = get_universities_by_tier(tier)
+    if not tier_universities:
+        tier_universities = UNIVERSITIES
+    university = random.choice(tier_universities)
+    uni_name = university['University Name']
+    uni_state = university['State']
+    uni_city = fake.city()
+
+    major = select_major_for_job(job_info)
+    major_name = major['name']
+
+    degree_levels = job_info.get('degree_level', ['Bachelor'])
+    if 'Master' in degree_levels or 'M.S.' in degree_levels:
+        degree_type = random.choice(["M.S.", "M.A."])
+        grad_year = random.randint(2024, 2025)
+        start_year = grad_year - 2
+    else:
+        degree_type = random.choice(["B.S.", "B.A."])
+        grad_year = random.randint(2024, 2025)
+        start_year = grad_year - 4
 
-    Args:
-        job_index: Job index number (1, 2, 3, ...)
-        count: Number of people to generate
-        tier: University tier
-        output_dir: Output directory
+    return {
+        'person_num': person_num,
+        # Assign a unique skill bias to this person
+        'skill_bias': SKILL_BIASES[(person_num - 1) % len(SKILL_BIASES)],
+        'name': fake.name(),
+        'phone': fake.msisdn()[:10],
+        'email': fake.email(),
+        'university': uni_name,
+        'uni_city': uni_city,
+        'uni_state': uni_state,
+        'course': f"{degree_type} in {major_name}",
+        'start_year': start_year,
+        'grad_year': grad_year,
+    }
+
+
+def build_resume_data(person, version, experience, project, skills, position, achievement):
+    """Build resume data for one person and treatment"""
+    location = f"{person['uni_city']}, {person['uni_state']}"
+    return {
+        "name": person['name'],
+        "course": person['course'],
+        "roll": str(random.randint(2020001, 2024999)),
+        "phone": person['phone'],
+        "email": person['email'],
+        "university": person['university'],
+        "location": location,
+        "skill_bias": person['skill_bias'],
+        "treatment": version,  # Track the treatment group
+        "education": [{
+            "school": person['university'],
+            "score": f"GPA: {round(random.uniform(3.2, 4.0), 2)}/4.0",
+            "degree": person['course'],
+            "year": f"{person['start_year']}-{person['grad_year']}",
+            "location": location
+        }],
+        "experiences": [experience],
+        "projects": [project],
+        "skills": skills,
+        "positions": [position],
+        "achievements": [achievement],
+    }
+
+
+def write_resume(resume_data, filename, output_dir):
+    """Write the .json file and render LaTeX. Returns (latex_content, pdf_path, json_path)"""
+    output_json = os.path.join(output_dir, f"{filename}.json")
+    output_pdf = os.path.join(output_dir, f"{filename}.pdf")
+
+    with open(output_json, "w", encoding="utf-8") as f:
+        json.dump(resume_data, f, indent=2, ensure_ascii=False)
+
+    return generate_latex(resume_data), output_pdf, output_json
+
+
+def pick(key):
+    """Task that selects one section from a fused node's result"""
+    async def run(content):
+        return content[key]
+    return run
+
+
+def constant(value):
+    """Task that returns content we already have (from a batch result file)"""
+    async def run():
+        return value
+    return run
+
+
+async def aprepare_batch(job_index, count, tier, offline=False):
     """
-    os.makedirs(output_dir, exist_ok=True)
-    init_tracking()
+    Load the job, its requirements and the people to generate for
 
+    Returns (job, job_info, persons, timestamp); job holds the listing
+    details that go into the tracking file. With offline=True the
+    requirements must already be in the precomputed store; SystemExit is
+    raised instead of parsing them with a live call.
+    """
     # Load job data
     job_data, job_path = get_job_by_index(job_index)
     job_desc = job_data.get('full_description', '')
-    job_title = job_data.get('job_title', 'Unknown')
-    company = job_data.get('company', 'Unknown')
-    location = job_data.get('location', 'Unknown')
+    job = {
+        'job_index': job_index,
+        'job_title': job_data.get('job_title', 'Unknown'),
+        'company': job_data.get('company', 'Unknown'),
+        'location': job_data.get('location', 'Unknown'),
+    }
 
     print(f"\n{'='*70}")
     print(f"Batch Generation")
     print(f"{'='*70}")
-    print(f"Job #{job_index}: {job_title} @ {company}")
-    print(f"Location: {location}")
-    print(f"Generating: {count} people x 3 treatments = {count * 3} resumes")
+    print(f"Job #{job_index}: {job['job_title']} @ {job['company']}")
+    print(f"Location: {job['location']}")
+    print(f"Generating: {count} people x {len(TREATMENT_GROUPS)} treatments = {count * len(TREATMENT_GROUPS)} resumes")
     print(f"Treatments: control, ai_course (AI in Experience), ai_project (AI in Project)")
     print(f"Tier: {tier}")
     print(f"{'='*70}\n")
 
-    # Parse job requirements ONCE (save API calls)
-    print("Step 1: Parsing job requirements (1 API call)...")
-    job_info = parse_job_requirements(job_desc)
+    # Parse job requirements ONCE (precomputed store, else 1 API call)
+    print("Step 1: Loading job requirements...")
+    if offline and lookup_job_requirements(job_desc) is None:
+        raise SystemExit(f"❌ Job #{job_index} has no precomputed requirements; "
+                         f"run --precompute first (it makes the live parse calls)")
+    job_info, precomputed = await aget_job_requirements(job_index, job_path, job_desc)
+    print(f"   {'From precomputed store' if precomputed else 'Parsed (1 API call)'}")
     print(f"   Core Skills: {', '.join(job_info.get('core_skills', [])[:5])}")
 
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    results = []
 
+    # Generate shared personal info up front (no API needed)
+    persons = []
     for person_num in range(1, count + 1):
-        person_id = f"job{job_index}_p{person_num}_{timestamp}"
-
-        # Assign a unique skill bias to this person
-        skill_bias = SKILL_BIASES[(person_num - 1) % len(SKILL_BIASES)]
-
+        person = generate_person(job_info, tier, person_num)
+        persons.append(person)
         print(f"\n{'─'*50}")
         print(f"Person {person_num}/{count}")
-        print(f"Skill Bias: {skill_bias}")
-        print(f"{'─'*50}")
-
-        # Generate shared personal info (no API needed)
-        tier_universities = get_universities_by_tier(tier)
-        if not tier_universities:
-            tier_universities = UNIVERSITIES
-        university = random.choice(tier_universities)
-        uni_name = university['University Name']
-        uni_state = university['State']
-        uni_city = fake.city()
-
-        major = select_major_for_job(job_info)
-        major_name = major['name']
-
-        degree_levels = job_info.get('degree_level', ['Bachelor'])
-        if 'Master' in degree_levels or 'M.S.' in degree_levels:
-            degree_type = random.choice(["M.S.", "M.A."])
-            grad_year = random.randint(2024, 2025)
-            start_year = grad_year - 2
+        print(f"Skill Bias: {person['skill_bias']}")
+        print(f"   Name: {person['name']}")
+        print(f"   University: {person['university']}")
+        print(f"   Major: {person['course']}")
+    print(f"{'─'*50}\n")
+
+    return job, job_info, persons, timestamp
+
+
+def add_content_tasks(graph, job_info, persons, fused=False):
+    """
+    Add an LLM task for every section of every person and treatment
+
+    Each person gets {p}/position and {p}/achievement, each treatment
+    {p}/{version}/experience, /project and /skills.
+    """
+    for person in persons:
+        p = f"p{person['person_num']}"
+
+        # Shared content (position, achievement)
+        if fused:
+            graph.add(f"{p}/shared", lambda: agenerate_shared_fused(job_info))
+            graph.add(f"{p}/position", pick("position"), deps=[f"{p}/shared"])
+            graph.add(f"{p}/achievement", pick("achievement"), deps=[f"{p}/shared"])
         else:
-            degree_type = random.choice(["B.S.", "B.A."])
-            grad_year = random.randint(2024, 2025)
-            start_year = grad_year - 4
-
-        course = f"{degree_type} in {major_name}"
-        person_name = fake.name()
-        phone = fake.msisdn()[:10]
-        email = fake.email()
-
-        print(f"   Name: {person_name}")
-        print(f"   University: {uni_name}")
-        print(f"   Major: {course}")
-
-        # Generate shared content (position, achievement - 2 API calls)
-        print("   Generating position & achievement...")
-        position = generate_position(job_info)
-        achievement = generate_achievement(job_info)
-
-        # Generate three treatment groups:
-        # - control: No AI content anywhere
-        # - ai_course: AI only in Experience
-        # - ai_project: AI only in Project
-        treatment_groups = [
-            {"name": "control", "exp_ai": False, "proj_ai": False},
-            {"name": "ai_course", "exp_ai": True, "proj_ai": False},
-            {"name": "ai_project", "exp_ai": False, "proj_ai": True},
-        ]
-
-        for treatment in treatment_groups:
-            version = treatment["name"]
-            print(f"\n   Generating [{version}] version...")
+            graph.add(f"{p}/position", lambda: agenerate_position(job_info))
+            graph.add(f"{p}/achievement", lambda: agenerate_achievement(job_info))
 
-            # Generate Experience (with or without AI based on treatment)
-            if treatment["exp_ai"]:
-                experience = generate_experience_with_ai(job_info)
+        for treatment in TREATMENT_GROUPS:
+            version = treatment["name"]
+            t = f"{p}/{version}"
+
+            if fused:
+                # Experience, project and skills in one call; AI rules are
+                # re-checked and broken sections regenerated on their own
+                graph.add(
+                    f"{t}/fused",
+                    lambda tr=treatment, bias=person['skill_bias']: agenerate_treatment_fused(
+                        job_info, tr["exp_ai"], tr["proj_ai"], skill_bias=bias
+                    )
+                )
+                for section in ["experience", "project", "skills"]:
+                    graph.add(f"{t}/{section}", pick(section), deps=[f"{t}/fused"])
             else:
-                experience = generate_experience_without_ai(job_info)
+                # Experience and Project (with or without AI based on treatment)
+                exp_fn = agenerate_experience_with_ai if treatment["exp_ai"] else agenerate_experience_without_ai
+                proj_fn = agenerate_project_with_ai if treatment["proj_ai"] else agenerate_project_without_ai
+                graph.add(f"{t}/experience", lambda fn=exp_fn: fn(job_info))
+                graph.add(f"{t}/project", lambda fn=proj_fn: fn(job_info))
+
+                # Skills - NEVER includes AI (per experiment design)
+                graph.add(
+                    f"{t}/skills",
+                    lambda experience, project, bias=person['skill_bias']: agenerate_skills(
+                        job_info, experience=experience, project=project, skill_bias=bias
+                    ),
+                    deps=[f"{t}/experience", f"{t}/project"]
+                )
+
+
+async def arender_batch(graph, job, persons, tier, timestamp, output_dir='resumes', compile_workers=None,
+                        keep_tex=True, batch_size=0):
+    """
+    Add a render task per person and treatment to graph, run it, and return the results
 
-            # Generate Project (with or without AI based on treatment)
-            if treatment["proj_ai"]:
-                project = generate_project_with_ai(job_info)
-            else:
-                project = generate_project_without_ai(job_info)
-
-            # Generate skills - NEVER includes AI (per experiment design)
-            skills = generate_skills(
-                job_info,
-                experience=experience,
-                project=project,
-                skill_bias=skill_bias
-            )
+    The graph must already have the content tasks add_content_tasks names.
+    Each resume is queued for typesetting as soon as its own inputs are
+    ready; up to compile_workers pdflatex processes run while generation
+    continues. With batch_size > 1, resumes are typeset batch_size at a
+    time as pages of one document and split back into per-resume PDFs.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    init_tracking()
+    job_index = job['job_index']
 
-            # Build resume data
-            resume_data = {
-                "name": person_name,
-                "course": course,
-                "roll": str(random.randint(2020001, 2024999)),
-                "phone": phone,
-                "email": email,
-                "university": uni_name,
-                "location": f"{uni_city}, {uni_state}",
-                "skill_bias": skill_bias,
-                "treatment": version,  # Track the treatment group
-                "education": [{
-                    "school": uni_name,
-                    "score": f"GPA: {round(random.uniform(3.2, 4.0), 2)}/4.0",
-                    "degree": course,
-                    "year": f"{start_year}-{grad_year}",
-                    "location": f"{uni_city}, {uni_state}"
-                }],
-                "experiences": [experience],
-                "projects": [project],
-                "skills": skills,
-                "positions": [position],
-                "achievements": [achievement],
-            }
+    print("Step 2: Generating content for all people and treatments...")
 
-            # Generate files
-            name_clean = person_name.replace(' ', '_').replace('.', '')
-            job_clean = job_title.replace(' ', '_').replace('/', '_')[:20]
+    def render_task(person, version):
+        async def run(experience, project, skills, position, achievement):
+            person_id = tracking_person_id(job_index, person, timestamp)
+            resume_data = build_resume_data(
+                person, version, experience, project, skills, position, achievement
+            )
+            name_clean = person['name'].replace(' ', '_').replace('.', '')
             filename = f"job{job_index}_{name_clean}_{version}_{timestamp}"
 
-            output_tex = os.path.join(output_dir, f"{filename}.tex")
-            output_json = os.path.join(output_dir, f"{filename}.json")
-            output_pdf = os.path.join(output_dir, f"{filename}.pdf")
+            latex_content, output_pdf, output_json = write_resume(resume_data, filename, output_dir)
 
-            # Write files
-            latex_content = generate_latex(resume_data)
-            with open(output_tex, "w", encoding="utf-8") as f:
-                f.write(latex_content)
-            with open(output_json, "w", encoding="utf-8") as f:
-                json.dump(resume_data, f, indent=2, ensure_ascii=False)
-
-            # Compile PDF
-            if compile_pdf(output_tex):
-                print(f"      PDF: {output_pdf}")
+            # Typesetting is blocking, hand it to the compile pool
+            if batcher is not None:
+                ok, pages = await batcher.compile(latex_content, output_pdf)
+            else:
+                ok, pages = await loop.run_in_executor(
+                    compile_pool, compile_pdf, latex_content, output_pdf, keep_tex
+                )
+
+            # Overflowed onto a second page: trim the longest bullet and
+            # recompile just this resume from the content we already have
+            trims = 0
+            while ok and pages is not None and pages > 1 and trims < MAX_TRIM_ROUNDS:
+                if not trim_longest_bullet(resume_data):
+                    break
+                trims += 1
+                latex_content, output_pdf, output_json = write_resume(resume_data, filename, output_dir)
+                ok, pages = await loop.run_in_executor(
+                    compile_pool, compile_pdf, latex_content, output_pdf, keep_tex
+                )
+
+            if ok:
+                note = ""
+                if trims:
+                    note = f" (trimmed {trims} bullet(s)" + (" to fit one page)" if pages == 1 else ")")
+                print(f"   [{person['name']} / {version}] PDF: {output_pdf}{note}")
+                if pages is None:
+                    print(f"   [{person['name']} / {version}] Warning: page count unknown, not checked for overflow")
+                elif pages > 1:
+                    print(f"   [{person['name']} / {version}] Warning: still {pages} pages")
             else:
-                print(f"      PDF failed!")
+                print(f"   [{person['name']} / {version}] PDF failed!")
 
             # Add tracking record
             add_tracking_record({
                 'job_index': job_index,
-                'job_title': job_title,
-                'company': company,
-                'location': location,
+                'job_title': job['job_title'],
+                'company': job['company'],
+                'location': job['location'],
                 'person_id': person_id,
-                'person_name': person_name,
-                'university': uni_name,
-                'major': course,
+                'person_name': person['name'],
+                'university': person['university'],
+                'major': person['course'],
                 'tier': tier,
                 'version': version,
                 'pdf_path': output_pdf,
                 'json_path': output_json,
                 'created_at': datetime.now().isoformat()
             })
-
-            results.append({
-                'person': person_name,
+            return {
+                'person': person['name'],
                 'version': version,
-                'pdf': output_pdf
-            })
+                'pdf': output_pdf,
+                'pages': pages
+            }
+        return run
+
+    render_nodes = []
+    for person in persons:
+        p = f"p{person['person_num']}"
+        for treatment in TREATMENT_GROUPS:
+            t = f"{p}/{treatment['name']}"
+            render_nodes.append(graph.add(
+                f"{t}/render",
+                render_task(person, treatment['name']),
+                deps=[f"{t}/experience", f"{t}/project", f"{t}/skills",
+                      f"{p}/position", f"{p}/achievement"]
+            ))
+
+    # Each worker thread just waits on its own pdflatex process, so
+    # threads are enough to keep compile_workers cores busy
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=compile_workers or COMPILE_WORKERS) as compile_pool:
+        batcher = None
+        if batch_size > 1:
+            batcher = CompileBatcher(compile_pool, len(render_nodes), batch_size, keep_tex)
+        outputs = await graph.run()
+    results = [outputs[name] for name in render_nodes]
 
     # Summary
     print(f"\n{'='*70}")
@@ -692,6 +858,244 @@ def generate_batch(job_index, count, tier='top', output_dir='resumes'):
     return results
 
 
+async def agenerate_batch(job_index, count, tier='top', output_dir='resumes', compile_workers=None,
+                          keep_tex=True, batch_size=0, fused=False):
+    """
+    Async version of generate_batch
+
+    Every LLM call for every person and treatment is a node in one task
+    graph. Only skills depend on anything (that treatment's experience and
+    project), so the critical path per person is two round trips.
+
+    With fused=True, each treatment's experience, project and skills come
+    from one LLM call and each person's position and achievement from
+    another (4 calls per person instead of 11).
+    """
+    job, job_info, persons, timestamp = await aprepare_batch(job_index, count, tier)
+
+    graph = TaskGraph()
+    add_content_tasks(graph, job_info, persons, fused=fused)
+    return await arender_batch(
+        graph, job, persons, tier, timestamp, output_dir=output_dir,
+        compile_workers=compile_workers, keep_tex=keep_tex, batch_size=batch_size
+    )
+
+
+def generate_batch(job_index, count, tier='top', output_dir='resumes', compile_workers=None, keep_tex=True,
+                   batch_size=0, fused=False):
+    """
+    Generate batch of resumes for one job
+
+    Args:
+        job_index: Job index number (1, 2, 3, ...)
+        count: Number of people to generate
+        tier: University tier
+        output_dir: Output directory
+        compile_workers: Max concurrent pdflatex runs (default: LATEX_WORKERS or CPU count)
+        keep_tex: Also save the .tex source next to each PDF
+        batch_size: Resumes per pdflatex run (0 = one run per resume)
+        fused: Generate each treatment's sections in one LLM call
+    """
+    return asyncio.run(agenerate_batch(
+        job_index, count, tier=tier, output_dir=output_dir,
+        compile_workers=compile_workers, keep_tex=keep_tex, batch_size=batch_size,
+        fused=fused
+    ))
+
+
+# ============================================================
+# Provider Batch Files
+# ============================================================
+# --export-batch writes every request a run would make to a JSONL file
+# for the provider's batch endpoint, plus a manifest with the people and
+# job requirements (which --precompute must have parsed already, so the
+# export makes no live calls either). --import-batch reads the result
+# files back and renders without any live calls; importing again replaces
+# the tracking rows of the earlier import. custom_ids are job{n}/ + the
+# task names above (e.g. job3/p1/ai_course/experience), so they are
+# stable for a given run.
+#
+# Skills are written from that treatment's experience and project, and
+# fused results that break the AI rules have their sections re-requested,
+# so some requests can only be made once earlier results are in. Import
+# then writes those to a follow-up request file instead of rendering;
+# submit it and import again with all result files.
+
+def manifest_path(requests_file):
+    return os.path.splitext(requests_file)[0] + '.manifest.json'
+
+
+def resolve_batch(manifest, results):
+    """
+    Match batch results to sections
+
+    Returns (sections, pending): content by task name for everything that
+    is done, and (custom_id, request) pairs for what still has to be sent.
+    """
+    job_info = manifest['job_info']
+    fused = manifest['fused']
+    prefix = f"job{manifest['job']['job_index']}/"
+    sections = {}
+    pending = []
+
+    def resolve(name, request, fused_content=None, broken=()):
+        """Single-section result, else the fused one if it passed the checks, else request it"""
+        key = name.rsplit('/', 1)[1]
+        if prefix + name in results:
+            sections[name] = results[prefix + name]
+        elif fused_content is not None and key not in broken:
+            sections[name] = fused_content[key]
+        elif request is not None:
+            pending.append((prefix + name, request))
+
+    for person in manifest['persons']:
+        p = f"p{person['person_num']}"
+
+        if fused:
+            shared = results.get(prefix + f"{p}/shared")
+            if shared is None:
+                pending.append((prefix + f"{p}/shared", section_request("shared", job_info)))
+            else:
+                broken = check_shared(shared)
+                for key in ["position", "achievement"]:
+                    resolve(f"{p}/{key}", section_request(key, job_info), shared, broken)
+        else:
+            for key in ["position", "achievement"]:
+                resolve(f"{p}/{key}", section_request(key, job_info))
+
+        for treatment in TREATMENT_GROUPS:
+            t = f"{p}/{treatment['name']}"
+            exp_ai, proj_ai = treatment['exp_ai'], treatment['proj_ai']
+            content, broken = None, ()
+
+            if fused:
+                content = results.get(prefix + f"{t}/fused")
+                if content is None:
+                    pending.append((prefix + f"{t}/fused", section_request(
+                        "treatment", job_info, exp_ai, proj_ai, skill_bias=person['skill_bias']
+                    )))
+                    continue
+                broken = check_treatment(content, exp_ai, proj_ai)
+
+            for key in ["experience", "project"]:
+                resolve(f"{t}/{key}", section_request(key, job_info, exp_ai, proj_ai), content, broken)
+
+            # Skills are derived from this treatment's final experience and project
+            request = None
+            if f"{t}/experience" in sections and f"{t}/project" in sections:
+                request = section_request(
+                    "skills", job_info, experience=sections[f"{t}/experience"],
+                    project=sections[f"{t}/project"], skill_bias=person['skill_bias']
+                )
+            resolve(f"{t}/skills", request, content, broken)
+
+    return sections, pending
+
+
+async def aexport_batch(job_index, count, requests_file, tier='top', fused=False):
+    """
+    Write the first round of batch requests for a run, and its manifest
+
+    Makes no LLM calls: the job's requirements must have been parsed with
+    --precompute beforehand.
+    """
+    job, job_info, persons, timestamp = await aprepare_batch(job_index, count, tier, offline=True)
+    manifest = {
+        'job': job,
+        'job_info': job_info,
+        'persons': persons,
+        'tier': tier,
+        'timestamp': timestamp,
+        'fused': fused,
+    }
+    _, pending = resolve_batch(manifest, {})
+
+    written = write_batch_requests(requests_file, pending)
+    with open(manifest_path(requests_file), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Wrote {written} requests to {requests_file}")
+    print(f"   Manifest: {manifest_path(requests_file)}")
+    if not fused:
+        print(f"   Skills need the experience/project results; import will write them as a second round")
+    return written
+
+
+def export_batch(job_index, count, requests_file, tier='top', fused=False):
+    """
+    Write every request a run would make to a batch request file instead of calling the API
+
+    Args:
+        job_index: Job index number (1, 2, 3, ...)
+        count: Number of people to generate
+        requests_file: JSONL file to write; the manifest goes next to it
+        tier: University tier
+        fused: Use the fused per-treatment requests
+    """
+    return asyncio.run(aexport_batch(job_index, count, requests_file, tier=tier, fused=fused))
+
+
+async def aimport_batch(manifest_file, result_files, output_dir='resumes', compile_workers=None,
+                        keep_tex=True, batch_size=0):
+    """
+    Render a run from batch result files, making no LLM calls
+
+    Returns the render results, or None if another round of requests is
+    needed; that round is written next to the manifest.
+    """
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    # Later files win, so a follow-up round overrides an earlier answer
+    results = {}
+    for path in result_files:
+        results.update(read_batch_results(path))
+
+    sections, pending = resolve_batch(manifest, results)
+    if pending:
+        followup = os.path.splitext(manifest_file)[0].removesuffix('.manifest') + f".round{len(result_files) + 1}.jsonl"
+        write_batch_requests(followup, pending)
+        print(f"⚠️ {len(pending)} requests still needed (missing, failed, or follow-up sections)")
+        print(f"   Wrote {followup}; submit it, then import again with all result files")
+        return None
+
+    job = manifest['job']
+    print(f"Importing batch results for job #{job['job_index']}: {job['job_title']} @ {job['company']}")
+
+    # Importing the same results again re-renders the same people: replace their rows
+    person_ids = {tracking_person_id(job['job_index'], person, manifest['timestamp'])
+                  for person in manifest['persons']}
+    removed = remove_tracking_records(person_ids)
+    if removed:
+        print(f"   Replacing {removed} tracking rows from an earlier import")
+    graph = TaskGraph()
+    for name, content in sections.items():
+        graph.add(name, constant(content))
+    return await arender_batch(
+        graph, job, manifest['persons'], manifest['tier'], manifest['timestamp'],
+        output_dir=output_dir, compile_workers=compile_workers, keep_tex=keep_tex, batch_size=batch_size
+    )
+
+
+def import_batch(manifest_file, result_files, output_dir='resumes', compile_workers=None, keep_tex=True,
+                 batch_size=0):
+    """
+    Finish a run exported with export_batch from its batch result files
+
+    Args:
+        manifest_file: Manifest written by export_batch
+        result_files: Batch result files, in the order they were returned
+        output_dir: Output directory
+        compile_workers: Max concurrent pdflatex runs (default: LATEX_WORKERS or CPU count)
+        keep_tex: Also save the .tex source next to each PDF
+        batch_size: Resumes per pdflatex run (0 = one run per resume)
+    """
+    return asyncio.run(aimport_batch(
+        manifest_file, result_files, output_dir=output_dir,
+        compile_workers=compile_workers, keep_tex=keep_tex, batch_size=batch_size
+    ))
+
+
 # ============================================================
 # Main
 # ============================================================
@@ -704,9 +1108,16 @@ if __name__ == "__main__":
 Examples:
   python3 generate_batch.py --list                    # List all jobs
   python3 generate_batch.py --list --start 20         # List jobs starting from #20
-  python3 generate_batch.py --job 1 --count 3         # Generate 3 people (6 resumes) for job #1
+  python3 generate_batch.py --job 1 --count 3         # Generate 3 people (9 resumes) for job #1
+  python3 generate_batch.py --job 1 --count 10 --concurrency 16
+  python3 generate_batch.py --job 1 --count 10 --compile-workers 4
+  python3 generate_batch.py --job 1 --count 50 --batch-size 25   # 6 pdflatex runs for 150 resumes
+  python3 generate_batch.py --job 1 --count 10 --fused          # 4 LLM calls per person instead of 11
   python3 generate_batch.py --job 5 --count 2 --tier medium
+  python3 generate_batch.py --job 1 --count 50 --export-batch batch/job1.jsonl   # Requests for the batch endpoint
+  python3 generate_batch.py --import-batch batch/job1_results.jsonl --manifest batch/job1.manifest.json
   python3 generate_batch.py --summary                 # Show tracking summary
+  python3 generate_batch.py --precompute --concurrency 16   # Parse all jobs ahead of time
         """
     )
 
@@ -725,19 +1136,60 @@ Examples:
                         help='Output directory (default: resumes)')
     parser.add_argument('--summary', action='store_true',
                         help='Show tracking summary')
+    parser.add_argument('--precompute', action='store_true',
+                        help='Parse requirements for all new/changed jobs into the store')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='Max LLM requests in flight (default: OPENAI_MAX_CONCURRENCY or 8)')
+    parser.add_argument('--compile-workers', type=int, default=None,
+                        help='Max concurrent pdflatex runs (default: LATEX_WORKERS or CPU count)')
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help='Typeset this many resumes per pdflatex run and split the PDF; needs pypdf '
+                             '(default: 0, one run each)')
+    parser.add_argument('--no-tex', action='store_true',
+                        help="Don't keep the .tex source next to each PDF")
+    parser.add_argument('--fused', action='store_true',
+                        help='Generate experience, project and skills per treatment in one LLM call')
+    parser.add_argument('--export-batch', metavar='FILE',
+                        help='Write the requests for --job to a batch endpoint JSONL file instead of calling the API')
+    parser.add_argument('--import-batch', metavar='FILE', nargs='+',
+                        help='Render from batch result file(s), oldest round first; needs --manifest')
+    parser.add_argument('--manifest', metavar='FILE',
+                        help='Manifest written next to the --export-batch file')
 
     args = parser.parse_args()
 
-    if args.list:
+    if args.concurrency:
+        set_max_concurrency(args.concurrency)
+
+    if args.precompute:
+        precompute_requirements()
+    elif args.list:
         list_jobs(start=args.start)
     elif args.summary:
         show_tracking_summary()
+    elif args.import_batch:
+        if not args.manifest:
+            parser.error('--import-batch needs --manifest')
+        import_batch(
+            args.manifest,
+            args.import_batch,
+            output_dir=args.output,
+            compile_workers=args.compile_workers,
+            keep_tex=not args.no_tex,
+            batch_size=args.batch_size
+        )
+    elif args.job and args.export_batch:
+        export_batch(args.job, args.count, args.export_batch, tier=args.tier, fused=args.fused)
     elif args.job:
         generate_batch(
             job_index=args.job,
             count=args.count,
             tier=args.tier,
-            output_dir=args.output
+            output_dir=args.output,
+            compile_workers=args.compile_workers,
+            keep_tex=not args.no_tex,
+            batch_size=args.batch_size,
+            fused=args.fused
         )
     else:
         parser.print_help()
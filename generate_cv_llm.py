@@ -7,7 +7,8 @@ import json
 import os
 import glob
 import random
-from llm_client import call_llm, call_llm_json
+import re
+from llm_client import call_llm, call_llm_json, acall_llm_json
 
 
 # Skill bias types - each person has a different focus area
@@ -20,11 +21,8 @@ SKILL_BIASES = [
 ]
 
 
-def parse_job_requirements(job_desc: str) -> dict:
-    """
-    Parse job description to extract requirements
-    Similar to the ChatGPT conversation step 1
-    """
+def _job_requirements_request(job_desc: str) -> tuple:
+    """Build (prompt, system_prompt, temperature) for parse_job_requirements"""
     prompt = f"""Analyze the following job description and extract the key requirements.
 Return a JSON object with the following structure:
 {{
@@ -44,14 +42,24 @@ Job Description:
 
     system_prompt = "You are an expert HR analyst who extracts job requirements from job descriptions."
 
-    return call_llm_json(prompt, system_prompt, temperature=0.3)
+    return prompt, system_prompt, 0.3
 
 
-def generate_experience_with_ai(job_info: dict) -> dict:
+def parse_job_requirements(job_desc: str) -> dict:
     """
-    Generate work experience entry that mentions AI/Generative AI
-    Similar to ChatGPT conversation step 2
+    Parse job description to extract requirements
+    Similar to the ChatGPT conversation step 1
     """
+    return call_llm_json(*_job_requirements_request(job_desc))
+
+
+async def aparse_job_requirements(job_desc: str) -> dict:
+    """Async version of parse_job_requirements"""
+    return await acall_llm_json(*_job_requirements_request(job_desc))
+
+
+def _experience_with_ai_request(job_info: dict) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_experience_with_ai"""
     prompt = f"""Generate a realistic internship work experience entry for a student applying to this job.
 The experience should be relevant to the job and MUST mention using Generative AI or AI-assisted tools.
 
@@ -81,14 +89,24 @@ The experience should:
 
     system_prompt = "You are a career counselor helping students create compelling resume experiences."
 
-    return call_llm_json(prompt, system_prompt, temperature=0.7)
+    return prompt, system_prompt, 0.7
 
 
-def generate_experience_without_ai(job_info: dict) -> dict:
+def generate_experience_with_ai(job_info: dict) -> dict:
     """
-    Generate work experience entry WITHOUT mentioning AI
-    Similar to ChatGPT conversation step 3
+    Generate work experience entry that mentions AI/Generative AI
+    Similar to ChatGPT conversation step 2
     """
+    return call_llm_json(*_experience_with_ai_request(job_info), use_cache=False)
+
+
+async def agenerate_experience_with_ai(job_info: dict) -> dict:
+    """Async version of generate_experience_with_ai"""
+    return await acall_llm_json(*_experience_with_ai_request(job_info), use_cache=False)
+
+
+def _experience_without_ai_request(job_info: dict) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_experience_without_ai"""
     prompt = f"""Generate a realistic internship work experience entry for a student applying to this job.
 The experience should be relevant to the job but should NOT mention AI, machine learning, or any AI-related tools.
 
@@ -118,14 +136,24 @@ The experience should:
 
     system_prompt = "You are a career counselor helping students create compelling resume experiences."
 
-    return call_llm_json(prompt, system_prompt, temperature=0.7)
+    return prompt, system_prompt, 0.7
 
 
-def generate_project_with_ai(job_info: dict) -> dict:
+def generate_experience_without_ai(job_info: dict) -> dict:
     """
-    Generate a course project that uses Generative AI
-    Similar to ChatGPT conversation step 4
+    Generate work experience entry WITHOUT mentioning AI
+    Similar to ChatGPT conversation step 3
     """
+    return call_llm_json(*_experience_without_ai_request(job_info), use_cache=False)
+
+
+async def agenerate_experience_without_ai(job_info: dict) -> dict:
+    """Async version of generate_experience_without_ai"""
+    return await acall_llm_json(*_experience_without_ai_request(job_info), use_cache=False)
+
+
+def _project_with_ai_request(job_info: dict) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_project_with_ai"""
     prompt = f"""Generate a realistic course project for a student applying to this job.
 The project should be relevant and MUST emphasize using Generative AI in the learning process.
 
@@ -152,14 +180,24 @@ The project should:
 
     system_prompt = "You are an academic advisor helping students showcase their projects."
 
-    return call_llm_json(prompt, system_prompt, temperature=0.7)
+    return prompt, system_prompt, 0.7
 
 
-def generate_project_without_ai(job_info: dict) -> dict:
+def generate_project_with_ai(job_info: dict) -> dict:
     """
-    Generate a course project WITHOUT AI
-    Similar to ChatGPT conversation step 5
+    Generate a course project that uses Generative AI
+    Similar to ChatGPT conversation step 4
     """
+    return call_llm_json(*_project_with_ai_request(job_info), use_cache=False)
+
+
+async def agenerate_project_with_ai(job_info: dict) -> dict:
+    """Async version of generate_project_with_ai"""
+    return await acall_llm_json(*_project_with_ai_request(job_info), use_cache=False)
+
+
+def _project_without_ai_request(job_info: dict) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_project_without_ai"""
     prompt = f"""Generate a realistic course project for a student applying to this job.
 The project should be relevant but should NOT mention AI, machine learning, or AI-related tools.
 
@@ -187,16 +225,24 @@ The project should:
 
     system_prompt = "You are an academic advisor helping students showcase their projects."
 
-    return call_llm_json(prompt, system_prompt, temperature=0.7)
+    return prompt, system_prompt, 0.7
 
 
-def generate_skills(job_info: dict, experience: dict = None, project: dict = None, skill_bias: str = None) -> dict:
+def generate_project_without_ai(job_info: dict) -> dict:
     """
-    Generate technical skills section based on experience and project
-
-    IMPORTANT: Skills should NEVER include AI-related content (per experiment design)
-    AI signals should only appear in Experience or Project narratives, not in Skills.
+    Generate a course project WITHOUT AI
+    Similar to ChatGPT conversation step 5
     """
+    return call_llm_json(*_project_without_ai_request(job_info), use_cache=False)
+
+
+async def agenerate_project_without_ai(job_info: dict) -> dict:
+    """Async version of generate_project_without_ai"""
+    return await acall_llm_json(*_project_without_ai_request(job_info), use_cache=False)
+
+
+def _skills_request(job_info: dict, experience: dict = None, project: dict = None, skill_bias: str = None) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_skills"""
     # Pick a random skill bias if not provided
     if skill_bias is None:
         skill_bias = random.choice(SKILL_BIASES)
@@ -264,15 +310,26 @@ Remember: NO AI-related content in any field!
 
     system_prompt = "You are a career counselor helping students create authentic, personalized skill sections. You must NEVER include AI-related skills, tools, or interests."
 
-    return call_llm_json(prompt, system_prompt, temperature=0.8)
+    return prompt, system_prompt, 0.8
 
 
-def generate_position(job_info: dict) -> dict:
+def generate_skills(job_info: dict, experience: dict = None, project: dict = None, skill_bias: str = None) -> dict:
     """
-    Generate a position of responsibility (extracurricular)
+    Generate technical skills section based on experience and project
 
-    IMPORTANT: Must NOT include any AI-related content per experiment design.
+    IMPORTANT: Skills should NEVER include AI-related content (per experiment design)
+    AI signals should only appear in Experience or Project narratives, not in Skills.
     """
+    return call_llm_json(*_skills_request(job_info, experience, project, skill_bias), use_cache=False)
+
+
+async def agenerate_skills(job_info: dict, experience: dict = None, project: dict = None, skill_bias: str = None) -> dict:
+    """Async version of generate_skills"""
+    return await acall_llm_json(*_skills_request(job_info, experience, project, skill_bias), use_cache=False)
+
+
+def _position_request(job_info: dict) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_position"""
     prompt = f"""Generate a realistic extracurricular position of responsibility for a student.
 This should be related to the job field but in an academic/club context.
 
@@ -296,15 +353,25 @@ Examples: Data Analytics Club Treasurer, Business Society VP, Statistics Tutorin
 
     system_prompt = "You are helping students showcase their leadership experience. Never include AI-related organizations or responsibilities."
 
-    return call_llm_json(prompt, system_prompt, temperature=0.7)
+    return prompt, system_prompt, 0.7
 
 
-def generate_achievement(job_info: dict) -> dict:
+def generate_position(job_info: dict) -> dict:
     """
-    Generate an academic achievement
+    Generate a position of responsibility (extracurricular)
 
     IMPORTANT: Must NOT include any AI-related content per experiment design.
     """
+    return call_llm_json(*_position_request(job_info), use_cache=False)
+
+
+async def agenerate_position(job_info: dict) -> dict:
+    """Async version of generate_position"""
+    return await acall_llm_json(*_position_request(job_info), use_cache=False)
+
+
+def _achievement_request(job_info: dict) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_achievement"""
     prompt = f"""Generate a realistic academic achievement for a student applying to this job.
 
 Job Title: {job_info.get('job_title', 'Data Analyst')}
@@ -327,7 +394,251 @@ Keep it realistic and academic (scholarship, case competition, honor roll, analy
 
     system_prompt = "You are helping students highlight their achievements. Never include AI-related achievements or competitions."
 
-    return call_llm_json(prompt, system_prompt, temperature=0.7)
+    return prompt, system_prompt, 0.7
+
+
+def generate_achievement(job_info: dict) -> dict:
+    """
+    Generate an academic achievement
+
+    IMPORTANT: Must NOT include any AI-related content per experiment design.
+    """
+    return call_llm_json(*_achievement_request(job_info), use_cache=False)
+
+
+async def agenerate_achievement(job_info: dict) -> dict:
+    """Async version of generate_achievement"""
+    return await acall_llm_json(*_achievement_request(job_info), use_cache=False)
+
+
+# ============================================================
+# Fused Generation
+# ============================================================
+# One call per treatment (experience + project + skills) and one per person
+# (position + achievement) instead of five separate ones. The AI rules are
+# checked on the result; any section that breaks them is regenerated with
+# its single-section function above.
+
+# Terms that count as "AI content" when checking generated sections
+AI_TERMS_PATTERN = re.compile(
+    r"\b(AI|ML|LLMs?|NLP|GPT[-\w]*|ChatGPT|Copilot)\b|"
+    r"(?i:\b(artificial intelligence|machine learning|deep learning|generative|neural networks?|"
+    r"tensorflow|pytorch|prompt engineering|large language models?)\b)"
+)
+
+
+def mentions_ai(section) -> bool:
+    """True if any text in a generated section mentions AI"""
+    return AI_TERMS_PATTERN.search(json.dumps(section, ensure_ascii=False)) is not None
+
+
+def _treatment_request(job_info: dict, exp_ai: bool, proj_ai: bool, skill_bias: str = None) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_treatment_fused"""
+    if skill_bias is None:
+        skill_bias = random.choice(SKILL_BIASES)
+
+    if exp_ai:
+        experience_rule = "MUST mention Generative AI, AI tools, or AI-assisted analysis"
+    else:
+        experience_rule = "must NOT mention AI, machine learning, or any AI-related tools; focus on traditional data analysis"
+    if proj_ai:
+        project_rule = "MUST emphasize using Generative AI, LLMs, or AI-assisted development"
+    else:
+        project_rule = "must NOT mention AI, ML, or related technologies; focus on traditional analysis/development"
+
+    prompt = f"""Generate three resume sections for a student applying to this job: an internship
+experience, a course project, and a technical skills section.
+
+Job Title: {job_info.get('job_title', 'Data Analyst')}
+Industry: {job_info.get('industry', 'General')}
+Core Skills Required: {', '.join(job_info.get('core_skills', []))}
+Key Responsibilities: {', '.join(job_info.get('key_responsibilities', []))}
+
+Experience rules:
+1. An internship (entry-level appropriate) at a realistic but fictional company
+2. It {experience_rule}
+3. Use realistic metrics and achievements that match the industry and skills
+
+Project rules:
+1. A course project (academic), relevant to the job requirements
+2. It {project_rule}
+
+Skills rules:
+1. DERIVE the skills from the experience and project you wrote above
+2. This person has a "{skill_bias}" background - emphasize skills in that area
+3. Include only 60-70% of the job's core skills, plus some tangential or coursework skills
+4. **ABSOLUTELY NO AI-RELATED SKILLS:** no AI, Machine Learning, Deep Learning, LLM, GPT, ChatGPT,
+   Copilot, Generative AI, NLP, Neural Networks, TensorFlow, PyTorch, Prompt Engineering or similar,
+   even if the experience or project mentions AI tools
+
+Return JSON format:
+{{
+    "experience": {{
+        "company": "Company Name",
+        "city": "City Name",
+        "role": "Intern Role Title",
+        "dates": "May 2024 - Aug 2024",
+        "items": ["First bullet point", "Second bullet point"]
+    }},
+    "project": {{
+        "name": "Project Name",
+        "description": "Brief description",
+        "dates": "Sep 2024 - Dec 2024",
+        "items": ["Tools: List of technologies", "Achievement or result"]
+    }},
+    "skills": {{
+        "languages": "3-5 programming languages based on experience",
+        "tools": "4-6 tools the person actually used (NO AI tools)",
+        "frameworks": "3-5 frameworks/libraries from their work (NO AI frameworks)",
+        "databases": "2-4 databases they worked with",
+        "soft_skills": "3-4 soft skills demonstrated in their experience",
+        "coursework": "4-5 relevant courses (NO AI/ML courses)",
+        "interests": "2-3 professional interests (NO AI-related interests)"
+    }}
+}}
+"""
+
+    system_prompt = "You are a career counselor helping students create compelling, authentic resume sections. You must NEVER include AI-related skills, tools, or interests in the skills section."
+
+    return prompt, system_prompt, 0.7
+
+
+def check_treatment(content: dict, exp_ai: bool, proj_ai: bool) -> list:
+    """Return the sections of a fused treatment that are missing or break the AI rules"""
+    broken = []
+    for key, wants_ai in [("experience", exp_ai), ("project", proj_ai), ("skills", False)]:
+        section = content.get(key)
+        if not isinstance(section, dict) or mentions_ai(section) != wants_ai:
+            broken.append(key)
+    return broken
+
+
+def generate_treatment_fused(job_info: dict, exp_ai: bool, proj_ai: bool, skill_bias: str = None) -> dict:
+    """
+    Generate experience, project and skills for one treatment in a single call
+
+    Returns {"experience": ..., "project": ..., "skills": ...}. Sections that
+    break the AI rules are regenerated with the single-section functions.
+    """
+    content = call_llm_json(*_treatment_request(job_info, exp_ai, proj_ai, skill_bias), use_cache=False)
+    for key in check_treatment(content, exp_ai, proj_ai):
+        if key == "experience":
+            content[key] = (generate_experience_with_ai if exp_ai else generate_experience_without_ai)(job_info)
+        elif key == "project":
+            content[key] = (generate_project_with_ai if proj_ai else generate_project_without_ai)(job_info)
+        else:
+            content[key] = generate_skills(job_info, content.get("experience"), content.get("project"), skill_bias)
+    return content
+
+
+async def agenerate_treatment_fused(job_info: dict, exp_ai: bool, proj_ai: bool, skill_bias: str = None) -> dict:
+    """Async version of generate_treatment_fused"""
+    content = await acall_llm_json(*_treatment_request(job_info, exp_ai, proj_ai, skill_bias), use_cache=False)
+    broken = check_treatment(content, exp_ai, proj_ai)
+    # Experience and project first, so regenerated skills can be derived from them
+    for key in [k for k in broken if k != "skills"]:
+        if key == "experience":
+            fn = agenerate_experience_with_ai if exp_ai else agenerate_experience_without_ai
+        else:
+            fn = agenerate_project_with_ai if proj_ai else agenerate_project_without_ai
+        content[key] = await fn(job_info)
+    if "skills" in broken:
+        content["skills"] = await agenerate_skills(
+            job_info, content.get("experience"), content.get("project"), skill_bias
+        )
+    return content
+
+
+def _shared_request(job_info: dict) -> tuple:
+    """Build (prompt, system_prompt, temperature) for generate_shared_fused"""
+    prompt = f"""Generate an extracurricular position of responsibility and an academic achievement
+for a student applying to this job.
+
+Job Title: {job_info.get('job_title', 'Data Analyst')}
+Industry: {job_info.get('industry', 'General')}
+Major: {', '.join(job_info.get('major_families', ['Computer Science']))}
+
+**CRITICAL: Do NOT include any AI-related content:**
+- No AI clubs, ML groups, AI-related organizations or responsibilities
+- No AI competitions, hackathons, awards or machine learning recognitions
+- Focus on traditional academic/professional organizations and achievements
+
+Return JSON format:
+{{
+    "position": {{
+        "title": "Position Title",
+        "org": "Organization/Club Name (NO AI-related orgs)",
+        "tenure": "2023-2024"
+    }},
+    "achievement": {{
+        "title": "Achievement Title (e.g., 'Dean's List', '1st Place')",
+        "desc": "Brief description or award name (NO AI-related)",
+        "date": "2024"
+    }}
+}}
+
+Position examples: Data Analytics Club Treasurer, Business Society VP, Statistics Tutoring Lead.
+Achievement examples: scholarship, case competition, honor roll, analytics competition.
+"""
+
+    system_prompt = "You are helping students showcase their leadership and achievements. Never include AI-related organizations, responsibilities, achievements or competitions."
+
+    return prompt, system_prompt, 0.7
+
+
+def check_shared(content: dict) -> list:
+    """Return the sections of a fused position/achievement result that are missing or mention AI"""
+    return [key for key in ["position", "achievement"]
+            if not isinstance(content.get(key), dict) or mentions_ai(content[key])]
+
+
+def generate_shared_fused(job_info: dict) -> dict:
+    """
+    Generate position and achievement in a single call
+
+    Returns {"position": ..., "achievement": ...}; neither may mention AI.
+    """
+    content = call_llm_json(*_shared_request(job_info), use_cache=False)
+    for key in check_shared(content):
+        content[key] = generate_position(job_info) if key == "position" else generate_achievement(job_info)
+    return content
+
+
+async def agenerate_shared_fused(job_info: dict) -> dict:
+    """Async version of generate_shared_fused"""
+    content = await acall_llm_json(*_shared_request(job_info), use_cache=False)
+    for key in check_shared(content):
+        content[key] = await (agenerate_position(job_info) if key == "position" else agenerate_achievement(job_info))
+    return content
+
+
+# ============================================================
+# Batch Requests
+# ============================================================
+
+def section_request(section: str, job_info: dict, exp_ai: bool = False, proj_ai: bool = False,
+                    experience: dict = None, project: dict = None, skill_bias: str = None) -> tuple:
+    """
+    Build (prompt, system_prompt, temperature) for one section without sending it
+
+    section is one of experience, project, skills, position, achievement,
+    or treatment/shared for the fused requests. Used to write batch files.
+    """
+    if section == "experience":
+        return (_experience_with_ai_request if exp_ai else _experience_without_ai_request)(job_info)
+    if section == "project":
+        return (_project_with_ai_request if proj_ai else _project_without_ai_request)(job_info)
+    if section == "skills":
+        return _skills_request(job_info, experience, project, skill_bias)
+    if section == "position":
+        return _position_request(job_info)
+    if section == "achievement":
+        return _achievement_request(job_info)
+    if section == "treatment":
+        return _treatment_request(job_info, exp_ai, proj_ai, skill_bias)
+    if section == "shared":
+        return _shared_request(job_info)
+    raise ValueError(f"Unknown section: {section}")
 
 
 def generate_cv_content(job_desc: str, include_ai: bool = True) -> dict:
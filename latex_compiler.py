@@ -0,0 +1,690 @@
+"""
+Shared LaTeX compile driver for the resume generators
+- Dumps the resume preamble into a custom format file (mylatexformat) once
+- Compiles each resume body against that format
+- Reruns LaTeX only when the log or .aux says a rerun is needed
+- Reuses PDFs from a content-hash cache when the same source was built before
+- Builds in a RAM-backed scratch directory and moves only finished files out
+- Can typeset many resumes as one document and split it into per-resume PDFs
+- Can hand passes to a warm engine daemon (latex_daemon.py) instead of starting pdflatex
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+# pypdf is only needed to split multi-resume batches
+try:
+    from pypdf import PdfReader, PdfWriter
+    HAS_PYPDF = True
+except ImportError:
+    HAS_PYPDF = False
+
+LATEX_ENGINE = os.getenv("LATEX_ENGINE", "pdflatex")
+
+# Precompiled preamble formats live here, one per distinct preamble
+FORMAT_DIR = os.getenv("LATEX_FORMAT_DIR", ".latex_formats")
+
+# Set LATEX_USE_FORMAT=0 to always load the preamble from scratch
+USE_FORMAT = os.getenv("LATEX_USE_FORMAT", "1") != "0"
+
+BEGIN_DOCUMENT = "\\begin{document}"
+
+# Per-build scratch directories go here (default: /dev/shm if usable, else the system temp dir)
+SCRATCH_DIR = os.getenv("LATEX_SCRATCH_DIR") or ("/dev/shm" if os.access("/dev/shm", os.W_OK) else None)
+
+# Built PDFs keyed by source hash + engine version (set PDF_CACHE=0 to disable)
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE", "1") != "0"
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", ".pdf_cache")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+# The size limit is enforced on the first write and then every this many writes
+PDF_CACHE_PRUNE_EVERY = int(os.getenv("PDF_CACHE_PRUNE_EVERY", "100"))
+
+# Size of the compile pool used by batch runs (0 = one per CPU)
+COMPILE_WORKERS = int(os.getenv("LATEX_WORKERS", "0")) or os.cpu_count() or 1
+
+# Warm engine daemon (latex_daemon.py); unset to always start pdflatex directly
+DAEMON_SOCKET = os.getenv("LATEX_DAEMON_SOCKET")
+DAEMON_RETRY_SECONDS = 30  # after a failed request, run directly for this long
+
+# Upper bound on passes per compile, even if LaTeX keeps asking for more
+MAX_PASSES = int(os.getenv("LATEX_MAX_PASSES", "3"))
+
+# Log messages from the kernel, hyperref and rerunfilecheck asking for another pass
+RERUN_PATTERN = re.compile(
+    r"Rerun to get|Label\(s\) may have changed|Please rerun|Rerun LaTeX|"
+    r"rerun[^\n]*to get[^\n]*right",
+    re.IGNORECASE
+)
+
+_format_failures = set()  # preamble hashes whose format could not be built
+_format_locks = {}  # format name -> lock held while it is built
+_format_locks_lock = threading.Lock()
+_daemon_down_until = 0.0
+_pypdf_warned = False  # build_pdf_batch has said it can't split batches
+
+
+# ============================================================
+# Preamble Format
+# ============================================================
+
+def split_preamble(latex_content):
+    """Split LaTeX source into (preamble, body) at \\begin{document}"""
+    index = latex_content.find(BEGIN_DOCUMENT)
+    if index == -1:
+        return None, latex_content
+    return latex_content[:index], latex_content[index:]
+
+
+def format_name(preamble):
+    # Formats only load in the engine build that dumped them, so a TeX
+    # upgrade has to give every preamble a new name
+    payload = LATEX_ENGINE + "\n" + (engine_version() or "") + "\n" + preamble
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"resume_{digest[:16]}"
+
+
+def format_env():
+    """Environment that lets the engine find formats in FORMAT_DIR"""
+    env = os.environ.copy()
+    # Trailing separator keeps the default search path
+    env["TEXFORMATS"] = os.path.abspath(FORMAT_DIR) + os.pathsep + env.get("TEXFORMATS", "")
+    return env
+
+
+def ensure_format(preamble):
+    """
+    Return the name of a format with this preamble dumped into it,
+    building it first if needed. Returns None if it can't be built.
+
+    A new preamble gets a new name (content hash), so editing the template
+    rebuilds the format automatically on the next compile.
+    """
+    name = format_name(preamble)
+    fmt_file = os.path.join(FORMAT_DIR, f"{name}.fmt")
+    if os.path.exists(fmt_file):
+        return name
+    if name in _format_failures:
+        return None
+
+    # Compile workers share this process: one thread builds, the rest wait for it
+    with _format_locks_lock:
+        lock = _format_locks.setdefault(name, threading.Lock())
+    with lock:
+        if os.path.exists(fmt_file):
+            return name
+        if name in _format_failures:
+            return None
+        return _build_format(preamble, name, fmt_file)
+
+
+def discard_format(name):
+    """Stop using a format that doesn't load; it is rebuilt by the next run"""
+    print(f"⚠️ LaTeX format {name} failed to load, compiling without it")
+    _format_failures.add(name)
+    try:
+        os.remove(os.path.join(FORMAT_DIR, f"{name}.fmt"))
+    except FileNotFoundError:
+        pass
+
+
+def _build_format(preamble, name, fmt_file):
+    os.makedirs(FORMAT_DIR, exist_ok=True)
+
+    # Build under a private job name so builds in other processes can't clash
+    build_name = f"{name}_{os.getpid()}_{threading.get_ident()}"
+    source = os.path.join(FORMAT_DIR, f"{build_name}.tex")
+    built = os.path.join(FORMAT_DIR, f"{build_name}.fmt")
+    try:
+        with open(source, "w", encoding="utf-8") as f:
+            f.write(preamble + BEGIN_DOCUMENT + "\n\\end{document}\n")
+
+        result = subprocess.run(
+            [LATEX_ENGINE, "-ini", "-interaction=nonstopmode",
+             f"-jobname={build_name}", f"-output-directory={FORMAT_DIR}",
+             f"&{LATEX_ENGINE}", "mylatexformat.ltx", source],
+            capture_output=True, text=True
+        )
+        ok = result.returncode == 0 and os.path.exists(built)
+    except OSError as e:
+        # Engine missing or not runnable: compile without a format
+        print(f"⚠️ Could not run {LATEX_ENGINE} to build format {name}: {e}")
+        ok = False
+    finally:
+        for ext in [".tex", ".log"]:
+            try:
+                os.remove(os.path.join(FORMAT_DIR, build_name + ext))
+            except FileNotFoundError:
+                pass
+
+    if not ok:
+        print(f"⚠️ Could not build LaTeX format {name}, compiling without it")
+        _format_failures.add(name)
+        try:
+            os.remove(built)
+        except FileNotFoundError:
+            pass
+        return None
+
+    os.replace(built, fmt_file)
+    return name
+
+
+def run_latex(tex_file, output_dir, fmt=None):
+    """Run one LaTeX pass, optionally against a precompiled format"""
+    command = [LATEX_ENGINE, "-interaction=nonstopmode", f"-output-directory={output_dir}"]
+    env = None
+    if fmt:
+        command.append(f"-fmt={fmt}")
+        env = format_env()
+    command.append(tex_file)
+
+    if DAEMON_SOCKET and time.time() >= _daemon_down_until:
+        result = run_latex_daemon(command, tex_file, output_dir, fmt)
+        if result is not None:
+            return result
+    return subprocess.run(command, capture_output=True, text=True, env=env)
+
+
+# ============================================================
+# Warm Engine Daemon
+# ============================================================
+
+def daemon_request(payload, timeout=None, socket_path=None):
+    """Send one JSON request to the daemon and return its reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or DAEMON_SOCKET)
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("Daemon closed the connection")
+    return json.loads(line)
+
+
+def run_latex_daemon(command, tex_file, output_dir, fmt):
+    """
+    Run one pass on the daemon. Returns a CompletedProcess, or None if the
+    daemon couldn't do it; direct runs are then used for a while
+    """
+    global _daemon_down_until
+    try:
+        reply = daemon_request({
+            "op": "compile",
+            "tex_file": os.path.abspath(tex_file),
+            "output_dir": os.path.abspath(output_dir),
+            "fmt": fmt,
+        })
+        if reply.get("ok"):
+            return subprocess.CompletedProcess(command, reply["returncode"], reply["stdout"], reply["stderr"])
+        error = reply.get("error")
+    except (OSError, ValueError) as e:
+        error = e
+    print(f"⚠️ LaTeX daemon unavailable ({error}), compiling directly")
+    _daemon_down_until = time.time() + DAEMON_RETRY_SECONDS
+    return None
+
+
+# ============================================================
+# PDF Cache
+# ============================================================
+
+def _tmp_name(path):
+    """Sibling temp name, unique per process and thread"""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def move_into_place(src, dest):
+    """Atomically put src at dest, copying first if they're on different filesystems"""
+    try:
+        os.replace(src, dest)
+    except OSError:
+        tmp_path = _tmp_name(dest)
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dest)
+        os.remove(src)
+
+
+def write_atomic(path, content):
+    tmp_path = _tmp_name(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+@lru_cache(maxsize=None)
+def engine_version():
+    """First line of `<engine> --version`, or None if the engine isn't installed"""
+    try:
+        result = subprocess.run([LATEX_ENGINE, "--version"], capture_output=True, text=True)
+    except OSError:
+        return None
+    lines = result.stdout.splitlines()
+    return lines[0].strip() if result.returncode == 0 and lines else None
+
+
+def pdf_cache_key(latex_content):
+    version = engine_version()
+    if version is None:
+        return None
+    payload = LATEX_ENGINE + "\n" + version + "\n" + latex_content
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _pdf_cache_path(key):
+    return os.path.join(PDF_CACHE_DIR, key[:2], f"{key}.pdf")
+
+
+def pdf_cache_get(key, pdf_file):
+    """Place the cached PDF for key at pdf_file. Returns True on a hit"""
+    path = _pdf_cache_path(key)
+    if not os.path.exists(path):
+        return False
+
+    tmp_path = _tmp_name(pdf_file)
+    try:
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            # Different filesystem, or no hardlink support
+            shutil.copyfile(path, tmp_path)
+        # mtime doubles as last-access time for LRU eviction
+        os.utime(path)
+    except FileNotFoundError:
+        # Pruned by another run since the exists() check
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, pdf_file)
+    return True
+
+
+_pdf_cache_puts = 0
+_pdf_cache_puts_lock = threading.Lock()
+
+
+def pdf_cache_put(key, pdf_file):
+    global _pdf_cache_puts
+    path = _pdf_cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = _tmp_name(path)
+    shutil.copyfile(pdf_file, tmp_path)
+    os.replace(tmp_path, path)
+
+    # Pruning walks the whole cache, so don't do it on every write
+    with _pdf_cache_puts_lock:
+        prune = _pdf_cache_puts % max(1, PDF_CACHE_PRUNE_EVERY) == 0
+        _pdf_cache_puts += 1
+    if prune:
+        prune_pdf_cache()
+
+
+def prune_pdf_cache():
+    """Drop least recently used PDFs until the cache is under PDF_CACHE_MAX_BYTES"""
+    entries = []
+    for root, _, files in os.walk(PDF_CACHE_DIR):
+        for name in files:
+            if name.endswith(".tmp"):
+                continue  # still being written
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= PDF_CACHE_MAX_BYTES:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+
+
+# ============================================================
+# Compile
+# ============================================================
+
+def read_if_exists(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def needs_rerun(log_file, aux_before, aux_after):
+    """True if the last pass asked for another one"""
+    log = read_if_exists(log_file)
+    if log and RERUN_PATTERN.search(log):
+        return True
+    # A pre-existing .aux that changed may hold stale references
+    return aux_before is not None and aux_before != aux_after
+
+
+def run_passes(tex_file, output_dir, fmt, max_passes):
+    stem = os.path.join(output_dir, os.path.splitext(os.path.basename(tex_file))[0])
+    log_file, aux_file = stem + ".log", stem + ".aux"
+
+    results = []
+    aux_before = read_if_exists(aux_file)
+    for _ in range(max_passes):
+        result = run_latex(tex_file, output_dir, fmt)
+        results.append(result)
+        if result.returncode != 0:
+            break  # another pass won't fix an error
+        aux_after = read_if_exists(aux_file)
+        if not needs_rerun(log_file, aux_before, aux_after):
+            break
+        aux_before = aux_after
+    return results
+
+
+def compile_tex(tex_file, max_passes=None, output_dir=None, use_cache=True):
+    """
+    Compile a .tex file to PDF in output_dir (default: next to it)
+
+    If the same source was compiled before with the same engine, the cached
+    PDF is linked into place and LaTeX isn't run at all (results is empty).
+
+    Runs one pass, then more only while LaTeX asks for a rerun (up to
+    max_passes, default MAX_PASSES). The resume template has no
+    cross-references, so one pass is normally enough.
+
+    The preamble is loaded from a precompiled format when possible; if
+    that fails to produce a PDF, the file is compiled again the normal way.
+
+    Returns (pdf_ok, results) where results holds one CompletedProcess per pass.
+    """
+    max_passes = max(1, max_passes or MAX_PASSES)
+    output_dir = output_dir or os.path.dirname(tex_file) or "."
+    stem = os.path.splitext(os.path.basename(tex_file))[0]
+    pdf_file = os.path.join(output_dir, stem + ".pdf")
+
+    with open(tex_file, "r", encoding="utf-8") as f:
+        latex_content = f.read()
+
+    key = pdf_cache_key(latex_content) if use_cache and PDF_CACHE_ENABLED else None
+    if key and pdf_cache_get(key, pdf_file):
+        return True, []
+
+    # Never let LaTeX write into an old PDF: it may be a hardlink into the cache
+    try:
+        os.remove(pdf_file)
+    except FileNotFoundError:
+        pass
+
+    fmt = None
+    if USE_FORMAT:
+        preamble, _ = split_preamble(latex_content)
+        if preamble is not None:
+            fmt = ensure_format(preamble)
+
+    results = run_passes(tex_file, output_dir, fmt, max_passes)
+
+    if fmt and (results[-1].returncode != 0 or not os.path.exists(pdf_file)):
+        results = run_passes(tex_file, output_dir, None, max_passes)
+        if results[-1].returncode == 0 and os.path.exists(pdf_file):
+            # The document is fine, so the format is what's broken
+            discard_format(fmt)
+
+    pdf_ok = os.path.exists(pdf_file)
+    # A failed pass can still leave a PDF behind; only cache clean builds
+    if key and pdf_ok and results[-1].returncode == 0:
+        pdf_cache_put(key, pdf_file)
+    return pdf_ok, results
+
+
+def build_pdf(latex_content, pdf_file, keep_tex=True, max_passes=None, use_cache=True):
+    """
+    Build latex_content into pdf_file via a private scratch directory
+
+    The .tex, .aux, .log and .out files live in a per-build directory under
+    SCRATCH_DIR, so concurrent builds never collide and the output directory
+    sees no small-file churn. Only the finished PDF (and the .tex source if
+    keep_tex) is moved into place, atomically, so a build that dies leaves
+    nothing half-written behind.
+
+    Returns (pdf_ok, results) like compile_tex.
+    """
+    out_dir = os.path.dirname(pdf_file) or "."
+    stem = os.path.splitext(os.path.basename(pdf_file))[0]
+
+    key = pdf_cache_key(latex_content) if use_cache and PDF_CACHE_ENABLED else None
+    if key and pdf_cache_get(key, pdf_file):
+        pdf_ok, results = True, []
+    else:
+        build_dir = tempfile.mkdtemp(prefix="resume_build_", dir=SCRATCH_DIR)
+        try:
+            scratch_tex = os.path.join(build_dir, stem + ".tex")
+            with open(scratch_tex, "w", encoding="utf-8") as f:
+                f.write(latex_content)
+
+            pdf_ok, results = compile_tex(scratch_tex, max_passes, use_cache=False)
+            if pdf_ok:
+                scratch_pdf = os.path.join(build_dir, stem + ".pdf")
+                if key and results[-1].returncode == 0:
+                    pdf_cache_put(key, scratch_pdf)
+                move_into_place(scratch_pdf, pdf_file)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    if keep_tex:
+        write_atomic(os.path.join(out_dir, stem + ".tex"), latex_content)
+    return pdf_ok, results
+
+
+def compile_isolated(tex_file, max_passes=None, use_cache=True):
+    """Compile an existing .tex via build_pdf, placing the PDF next to it"""
+    with open(tex_file, "r", encoding="utf-8") as f:
+        latex_content = f.read()
+    pdf_file = os.path.splitext(tex_file)[0] + ".pdf"
+    return build_pdf(latex_content, pdf_file, keep_tex=False, max_passes=max_passes, use_cache=use_cache)
+
+
+# ============================================================
+# Page Count
+# ============================================================
+
+# "Output written on x.pdf (1 page, 51234 bytes)." on the terminal and in the log
+OUTPUT_WRITTEN_PATTERN = re.compile(r"Output written on .*?\((\d+) pages?\b", re.DOTALL)
+PDF_PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+PDF_COUNT_PATTERN = re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b")
+# Start of an object stream's data (pdfTeX packs the page tree into these by default)
+PDF_OBJSTM_PATTERN = re.compile(rb"<<(?:(?!>>).)*?/Type\s*/ObjStm\b(?:(?!>>).)*>>\s*stream\r?\n", re.DOTALL)
+
+
+def log_page_count(text):
+    """Page count from engine output or a .log, or None if it isn't there"""
+    if not text:
+        return None
+    # Lines are hard-wrapped at 79 columns, which can split the message
+    matches = OUTPUT_WRITTEN_PATTERN.findall(text.replace("\n", ""))
+    return int(matches[-1]) if matches else None
+
+
+def pdf_page_count(pdf_file):
+    """
+    Page count by scanning the raw PDF instead of parsing it
+
+    Uses the page tree's /Count (largest one is the root), else counts
+    /Type /Page objects. Compressed object streams are inflated and
+    scanned too. Returns None if neither is found.
+    """
+    try:
+        with open(pdf_file, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    for match in PDF_OBJSTM_PATTERN.finditer(data):
+        try:
+            # decompressobj stops at the end of the stream, whatever /Length says
+            data += b"\n" + zlib.decompressobj().decompress(data[match.end():])
+        except zlib.error:
+            continue
+    counts = [int(a or b) for a, b in PDF_COUNT_PATTERN.findall(data)]
+    if counts:
+        return max(counts)
+    pages = len(PDF_PAGE_PATTERN.findall(data))
+    if pages:
+        return pages
+    if HAS_PYPDF:
+        try:
+            return len(PdfReader(pdf_file).pages)
+        except Exception:
+            return None
+    return None
+
+
+def output_pages(results, pdf_file):
+    """Page count of a build: from the last pass's output if there was one, else from the PDF"""
+    if results:
+        pages = log_page_count(results[-1].stdout)
+        if pages is not None:
+            return pages
+    return pdf_page_count(pdf_file)
+
+
+# ============================================================
+# Multi-Document Batches
+# ============================================================
+
+END_DOCUMENT = "\\end{document}"
+BATCH_MARKER_PATTERN = re.compile(r"resumebatch:(\d+|end):(\d+)")
+
+
+def batch_source(preamble, bodies):
+    """
+    One document holding every body, each starting on a fresh page
+
+    Each body runs in its own group so local settings can't leak into the
+    next resume, and a \\typeout marker logs the page it starts on.
+    """
+    parts = [preamble, BEGIN_DOCUMENT, "\n"]
+    for i, body in enumerate(bodies):
+        parts.append(f"\\clearpage\\typeout{{resumebatch:{i}:\\the\\value{{page}}}}\\begingroup\n")
+        parts.append(body)
+        parts.append("\n\\clearpage\\endgroup\n")
+    parts.append("\\typeout{resumebatch:end:\\the\\value{page}}\n")
+    parts.append(END_DOCUMENT + "\n")
+    return "".join(parts)
+
+
+def batch_page_ranges(log_text, count):
+    """Return [(first_page, page_count)] per resume from the log markers, or None"""
+    starts = {}
+    for index, page in BATCH_MARKER_PATTERN.findall(log_text or ""):
+        starts[index] = int(page)
+    if "end" not in starts or any(str(i) not in starts for i in range(count)):
+        return None
+    bounds = [starts[str(i)] for i in range(count)] + [starts["end"]]
+    return [(bounds[i], bounds[i + 1] - bounds[i]) for i in range(count)]
+
+
+def split_pdf(pdf_file, page_ranges, outputs):
+    """Write pages [first, first + count) of pdf_file to each output path"""
+    reader = PdfReader(pdf_file)
+    for (first, count), output in zip(page_ranges, outputs):
+        writer = PdfWriter()
+        for page in range(first - 1, first - 1 + count):
+            writer.add_page(reader.pages[page])
+        with open(output, "wb") as f:
+            writer.write(f)
+
+
+def build_pdf_batch(documents, keep_tex=True, max_passes=None, use_cache=True):
+    """
+    Build many resumes with one LaTeX run per distinct preamble
+
+    documents is a list of (latex_content, pdf_file). Bodies sharing a
+    preamble are typeset as pages of a single document, which is split
+    back into one PDF per resume by the page ranges logged while
+    typesetting. A resume that doesn't come out as exactly one page, or
+    any resume when the batch run fails or pypdf isn't installed, is
+    built on its own with build_pdf instead.
+
+    Returns a list of (pdf_ok, pages) in the same order as documents.
+    """
+    global _pypdf_warned
+    results = [(False, None)] * len(documents)
+    groups = {}  # preamble -> [(index, body)]
+    fallback = []
+
+    if not HAS_PYPDF and len(documents) > 1 and not _pypdf_warned:
+        print("⚠️ pypdf is not installed (pip install pypdf): batches can't be split, "
+              "compiling each resume on its own")
+        _pypdf_warned = True
+
+    for i, (latex_content, pdf_file) in enumerate(documents):
+        key = pdf_cache_key(latex_content) if use_cache and PDF_CACHE_ENABLED else None
+        if key and pdf_cache_get(key, pdf_file):
+            results[i] = (True, pdf_page_count(pdf_file))
+            if keep_tex:
+                write_atomic(os.path.splitext(pdf_file)[0] + ".tex", latex_content)
+            continue
+
+        preamble, body = split_preamble(latex_content)
+        end = body.rfind(END_DOCUMENT)
+        if not HAS_PYPDF or preamble is None or end == -1:
+            fallback.append(i)
+            continue
+        groups.setdefault(preamble, []).append((i, body[len(BEGIN_DOCUMENT):end]))
+
+    for preamble, members in groups.items():
+        if len(members) == 1:
+            fallback.append(members[0][0])
+            continue
+
+        build_dir = tempfile.mkdtemp(prefix="resume_batch_", dir=SCRATCH_DIR)
+        try:
+            batch_tex = os.path.join(build_dir, "batch.tex")
+            with open(batch_tex, "w", encoding="utf-8") as f:
+                f.write(batch_source(preamble, [body for _, body in members]))
+
+            pdf_ok, passes = compile_tex(batch_tex, max_passes, use_cache=False)
+            ranges = None
+            if pdf_ok and passes[-1].returncode == 0:
+                ranges = batch_page_ranges(read_if_exists(os.path.join(build_dir, "batch.log")), len(members))
+            if ranges is None:
+                fallback.extend(i for i, _ in members)
+                continue
+
+            # Only one-page resumes are split out; anything else is rebuilt alone
+            single = [(i, first) for (i, _), (first, count) in zip(members, ranges) if count == 1]
+            fallback.extend(i for (i, _), (_, count) in zip(members, ranges) if count != 1)
+
+            outputs = [os.path.join(build_dir, f"{i}.pdf") for i, _ in single]
+            split_pdf(os.path.join(build_dir, "batch.pdf"), [(first, 1) for _, first in single], outputs)
+
+            for (i, _), output in zip(single, outputs):
+                latex_content, pdf_file = documents[i]
+                key = pdf_cache_key(latex_content) if use_cache and PDF_CACHE_ENABLED else None
+                if key:
+                    pdf_cache_put(key, output)
+                move_into_place(output, pdf_file)
+                if keep_tex:
+                    write_atomic(os.path.splitext(pdf_file)[0] + ".tex", latex_content)
+                results[i] = (True, 1)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    for i in sorted(fallback):
+        latex_content, pdf_file = documents[i]
+        pdf_ok, passes = build_pdf(latex_content, pdf_file, keep_tex, max_passes, use_cache)
+        results[i] = (pdf_ok, output_pages(passes, pdf_file) if pdf_ok else None)
+    return results
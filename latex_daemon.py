@@ -0,0 +1,333 @@
+"""
+Warm LaTeX compile daemon
+- Keeps engine processes started ahead of time, each with its format already loaded
+- latex_compiler.run_latex hands it passes over a unix socket (LATEX_DAEMON_SOCKET)
+- Dead or stuck engines are replaced; clients fall back to direct runs if the daemon is down
+- Opt-in only (nothing uses it unless LATEX_DAEMON_SOCKET is set); run --self-test
+  against your TeX installation before relying on it
+
+Usage:
+    python3 latex_daemon.py --self-test                         # check the warm-engine protocol works here
+    python3 latex_daemon.py --socket /tmp/latex.sock --workers 4
+    python3 latex_daemon.py --socket /tmp/latex.sock --ping     # health check
+"""
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from latex_compiler import (
+    BEGIN_DOCUMENT, FORMAT_DIR, LATEX_ENGINE, SCRATCH_DIR,
+    daemon_request, ensure_format, move_into_place, split_preamble,
+)
+
+JOB_NAME = "job"
+# The document is copied into the engine's directory under this name, so the
+# \input line never has to quote a path with spaces or TeX special characters
+INPUT_NAME = "input.tex"
+OUTPUT_EXTS = [".pdf", ".log", ".aux", ".out"]
+
+# A pass that takes longer than this is killed
+JOB_TIMEOUT = float(os.getenv("LATEX_DAEMON_JOB_TIMEOUT", "120"))
+
+# How often idle engines are checked and replaced if they died
+HEALTH_INTERVAL = 10
+
+
+class WarmEngine:
+    """
+    One engine process that has loaded its format and waits for a document
+
+    TeX only loads the format after reading its first line, so the engine
+    is started with a bare \\relax; after that it sits at the "*" prompt
+    until run() sends the real document. Each engine is used once.
+
+    A mylatexformat format skips the document's preamble on load: it reads
+    on from the current input, here the terminal, up to \\begin{document}.
+    So with a format, run() types \\begin{document} itself and only \\inputs
+    the body; the preamble is the one dumped in the format.
+
+    The engine runs in its own work_dir, so documents must not \input or
+    include files relative to their own directory (our resumes don't).
+    """
+
+    def __init__(self, fmt, format_dir):
+        self.fmt = fmt
+        self.work_dir = tempfile.mkdtemp(prefix="latex_daemon_", dir=SCRATCH_DIR)
+
+        command = [LATEX_ENGINE, f"-jobname={JOB_NAME}", f"-output-directory={self.work_dir}"]
+        env = os.environ.copy()
+        if fmt:
+            command.append(f"-fmt={fmt}")
+            env["TEXFORMATS"] = format_dir + os.pathsep + env.get("TEXFORMATS", "")
+
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, env=env, cwd=self.work_dir
+        )
+        self.process.stdin.write("\\relax\n")
+        self.process.stdin.flush()
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, tex_file, output_dir, timeout=JOB_TIMEOUT):
+        """Typeset tex_file; outputs are moved to output_dir under the file's own name"""
+        stem = os.path.splitext(os.path.basename(tex_file))[0]
+
+        # Reruns need the .aux written by the previous pass
+        aux_file = os.path.join(output_dir, stem + ".aux")
+        if os.path.exists(aux_file):
+            shutil.copyfile(aux_file, os.path.join(self.work_dir, JOB_NAME + ".aux"))
+
+        input_file = os.path.join(self.work_dir, INPUT_NAME)
+        command = "\\nonstopmode\\input{" + INPUT_NAME + "}\n"
+        if self.fmt:
+            with open(tex_file, "r", encoding="utf-8") as f:
+                _, body = split_preamble(f.read())
+            with open(input_file, "w", encoding="utf-8") as f:
+                f.write(body[len(BEGIN_DOCUMENT):] if body.startswith(BEGIN_DOCUMENT) else body)
+            # Ends the format's preamble skip, which is reading the terminal
+            command = BEGIN_DOCUMENT + command
+        else:
+            shutil.copyfile(tex_file, input_file)
+
+        # nonstopmode from here on: a missing \end{document} aborts instead of prompting
+        stdout, stderr = self.process.communicate(command, timeout=timeout)
+
+        for ext in OUTPUT_EXTS:
+            built = os.path.join(self.work_dir, JOB_NAME + ext)
+            if os.path.exists(built):
+                move_into_place(built, os.path.join(output_dir, stem + ext))
+        return self.process.returncode, stdout, stderr
+
+    def close(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+class EnginePool:
+    """Idle warm engines, up to `size` per format"""
+
+    def __init__(self, size, format_dir):
+        self.size = size
+        self.format_dir = format_dir
+        self.idle = {}  # fmt -> [WarmEngine]
+        self.starting = {}  # fmt -> engines being started by refill()
+        self.lock = threading.Lock()
+
+    def acquire(self, fmt):
+        with self.lock:
+            engines = self.idle.get(fmt, [])
+            while engines:
+                engine = engines.pop()
+                if engine.alive():
+                    return engine
+                engine.close()
+        # Nothing warm yet for this format: start one cold
+        return WarmEngine(fmt, self.format_dir)
+
+    def refill(self, fmt):
+        """Start engines until `size` are waiting for fmt"""
+        while True:
+            with self.lock:
+                if len(self.idle.get(fmt, [])) + self.starting.get(fmt, 0) >= self.size:
+                    return
+                self.starting[fmt] = self.starting.get(fmt, 0) + 1
+            engine = None
+            try:
+                engine = WarmEngine(fmt, self.format_dir)
+            finally:
+                with self.lock:
+                    self.starting[fmt] -= 1
+                    if engine is not None:
+                        self.idle.setdefault(fmt, []).append(engine)
+
+    def check(self):
+        """Health check: drop idle engines that died and start replacements"""
+        with self.lock:
+            formats = list(self.idle)
+            for fmt in formats:
+                alive = []
+                for engine in self.idle[fmt]:
+                    if engine.alive():
+                        alive.append(engine)
+                    else:
+                        print(f"⚠️ Warm engine for {fmt or 'default format'} exited, replacing it", file=sys.stderr)
+                        engine.close()
+                self.idle[fmt] = alive
+        for fmt in formats:
+            self.refill(fmt)
+
+    def status(self):
+        with self.lock:
+            return {fmt or "": len(engines) for fmt, engines in self.idle.items()}
+
+    def close(self):
+        with self.lock:
+            for engines in self.idle.values():
+                for engine in engines:
+                    engine.close()
+            self.idle = {}
+
+
+# ============================================================
+# Server
+# ============================================================
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """One newline-terminated JSON request per connection, one JSON reply"""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            reply = self.server.dispatch(request)
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+class LatexDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, workers, format_dir):
+        self.pool = EnginePool(workers, format_dir)
+        self.slots = threading.Semaphore(workers)
+        self.started_at = time.time()
+        super().__init__(socket_path, RequestHandler)
+
+    def dispatch(self, request):
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "uptime": time.time() - self.started_at,
+                    "idle": self.pool.status()}
+        if op == "compile":
+            return self.compile(request)
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def compile(self, request):
+        fmt = request.get("fmt")
+        with self.slots:
+            # An engine that dies on a signal crashed; retry once on a fresh one
+            for _ in range(2):
+                engine = self.pool.acquire(fmt)
+                threading.Thread(target=self.pool.refill, args=(fmt,), daemon=True).start()
+                try:
+                    returncode, stdout, stderr = engine.run(request["tex_file"], request["output_dir"])
+                except subprocess.TimeoutExpired:
+                    return {"ok": False, "error": "Timed out"}
+                finally:
+                    engine.close()
+                if returncode >= 0:
+                    return {"ok": True, "returncode": returncode, "stdout": stdout, "stderr": stderr}
+        return {"ok": False, "error": "Engine crashed"}
+
+    def watch(self):
+        while True:
+            time.sleep(HEALTH_INTERVAL)
+            self.pool.check()
+
+
+def serve(socket_path, workers, format_dir):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = LatexDaemon(socket_path, workers, os.path.abspath(format_dir))
+    threading.Thread(target=server.watch, daemon=True).start()
+    # Shut down cleanly on kill/systemctl stop too, so warm engines don't leak
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"LaTeX daemon listening on {socket_path} ({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.close()
+        os.remove(socket_path)
+
+
+SELF_TEST_PREAMBLE = "\\documentclass{article}\n\\usepackage{xcolor}\n"
+
+
+def self_test():
+    """
+    Typeset a small document from a path with spaces and TeX special
+    characters through warm engines, without and with a precompiled format.
+    Returns True if both produced a PDF
+    """
+    test_dir = tempfile.mkdtemp(prefix="latex daemon #test_", dir=SCRATCH_DIR)
+    try:
+        tex_file = os.path.join(test_dir, "resume & cv 100%.tex")
+        with open(tex_file, "w", encoding="utf-8") as f:
+            f.write(SELF_TEST_PREAMBLE + BEGIN_DOCUMENT + "\nWarm engine check\n\\end{document}\n")
+        pdf_file = os.path.splitext(tex_file)[0] + ".pdf"
+
+        fmt = ensure_format(SELF_TEST_PREAMBLE)
+        if fmt is None:
+            print(f"❌ Could not build a format with {LATEX_ENGINE}")
+            return False
+
+        ok = True
+        for label, engine_fmt in [("no format", None), (f"format {fmt}", fmt)]:
+            if os.path.exists(pdf_file):
+                os.remove(pdf_file)
+            try:
+                engine = WarmEngine(engine_fmt, os.path.abspath(FORMAT_DIR))
+            except OSError as e:
+                print(f"❌ Could not start {LATEX_ENGINE}: {e}")
+                return False
+            try:
+                returncode, stdout, _ = engine.run(tex_file, test_dir)
+            finally:
+                engine.close()
+            if returncode == 0 and os.path.exists(pdf_file):
+                print(f"✅ Warm engine ({label}) typeset {tex_file}")
+            else:
+                print(f"❌ Warm engine ({label}) failed (exit {returncode}):\n{stdout[-2000:]}")
+                ok = False
+        return ok
+    finally:
+        shutil.rmtree(test_dir, ignore_errors=True)
+
+
+# ============================================================
+# Main
+# ============================================================
+
+if __name__ == "__main__":
+    from latex_compiler import COMPILE_WORKERS, DAEMON_SOCKET
+
+    parser = argparse.ArgumentParser(description='Warm LaTeX compile daemon')
+    parser.add_argument('--socket', default=DAEMON_SOCKET or '/tmp/latex_daemon.sock',
+                        help='Unix socket path (default: LATEX_DAEMON_SOCKET or /tmp/latex_daemon.sock)')
+    parser.add_argument('--workers', type=int, default=COMPILE_WORKERS,
+                        help='Concurrent passes, and warm engines kept per format (default: LATEX_WORKERS or CPU count)')
+    parser.add_argument('--format-dir', default=FORMAT_DIR,
+                        help=f'Where precompiled formats live (default: {FORMAT_DIR})')
+    parser.add_argument('--ping', action='store_true',
+                        help='Check that a daemon is answering on --socket and exit')
+    parser.add_argument('--self-test', action='store_true',
+                        help='Typeset a test document through a warm engine and exit')
+    args = parser.parse_args()
+
+    if args.self_test:
+        sys.exit(0 if self_test() else 1)
+    elif args.ping:
+        try:
+            reply = daemon_request({"op": "ping"}, timeout=5, socket_path=args.socket)
+        except (OSError, ValueError) as e:
+            print(f"❌ No daemon on {args.socket}: {e}")
+            sys.exit(1)
+        print(f"✅ Daemon pid {reply['pid']} up {reply['uptime']:.0f}s, idle engines: {reply['idle']}")
+    else:
+        serve(args.socket, max(1, args.workers), args.format_dir)
@@ -3,9 +3,17 @@ LLM Client for CV generation
 Uses OpenAI-compatible API
 """
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError
+from email.utils import parsedate_to_datetime
+import asyncio
+import hashlib
 import json
 import os
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
 
 # Load .env file if exists
 try:
@@ -19,52 +27,1087 @@ API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key-here")
 BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
 
+# Max number of requests in flight at once for the async client
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+
+# Provider quota: requests and tokens per minute (0 = no limit)
+RATE_LIMIT_RPM = float(os.getenv("OPENAI_RPM", "0"))
+RATE_LIMIT_TPM = float(os.getenv("OPENAI_TPM", "0"))
+# Per-endpoint overrides keyed "base_url|model", base_url or model, e.g.
+# {"https://api.openai.com/v1|gpt-4": {"rpm": 500, "tpm": 30000, "concurrency": 16}}
+RATE_LIMITS = json.loads(os.getenv("OPENAI_RATE_LIMITS", "{}"))
+
+# Retries for 429s, 5xx and connection errors
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "8"))
+BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1"))
+BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "60"))
+
+# On-disk response cache (set LLM_CACHE=0 to disable)
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+# Size/age limits are enforced on the first write and then every this many writes
+CACHE_PRUNE_EVERY = int(os.getenv("LLM_CACHE_PRUNE_EVERY", "200"))
+
+JSON_ONLY_INSTRUCTION = "Always respond with valid JSON only, no markdown formatting."
+
+# JSON calls stream the completion and stop once the object closes (LLM_STREAM_JSON=0 disables it)
+STREAM_JSON = os.getenv("LLM_STREAM_JSON", "1") != "0"
+# Re-prompts for missing/invalid fields before giving up on them
+FIELD_RETRIES = int(os.getenv("LLM_FIELD_RETRIES", "2"))
+
+# Retries are done by the rate limiter below, not the SDK
 client = OpenAI(
     api_key=API_KEY,
-    base_url=BASE_URL
+    base_url=BASE_URL,
+    max_retries=0
 )
 
+# Async client is created lazily, one per event loop,
+# so every coroutine in a run shares the same connection pool.
+_async_client = None
+_async_loop = None
 
-def call_llm(prompt: str, system_prompt: str = None, temperature: float = 0.7) -> str:
-    """
-    Call LLM with the given prompt
-    """
+
+def set_max_concurrency(limit: int):
+    """Change the in-flight request limit used by acall_llm"""
+    global MAX_CONCURRENCY
+    MAX_CONCURRENCY = max(1, int(limit))
+    with _limiters_lock:
+        for limiter in _limiters.values():
+            limiter.set_max_concurrency(MAX_CONCURRENCY)
+
+
+def get_async_client():
+    """Return the shared AsyncOpenAI client for the running loop"""
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = AsyncOpenAI(
+            api_key=API_KEY,
+            base_url=BASE_URL,
+            max_retries=0
+        )
+        _async_loop = loop
+    return _async_client
+
+
+def build_messages(prompt: str, system_prompt: str = None) -> list:
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
     messages.append({"role": "user", "content": prompt})
+    return messages
+
 
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=messages,
-        temperature=temperature
-    )
+def json_system_prompt(system_prompt: str = None) -> str:
+    if system_prompt is None:
+        return "You are a helpful assistant. " + JSON_ONLY_INSTRUCTION
+    return system_prompt + "\n\n" + JSON_ONLY_INSTRUCTION
 
-    return response.choices[0].message.content
 
+# ============================================================
+# JSON Extraction
+# ============================================================
+# Models wrap JSON in prose or fences, leave trailing commas, echo the
+# // comments from our templates, or get cut off. extract_json takes the
+# first object that parses and repairs what it can; call_llm_json then
+# re-asks only for the fields that are still missing or were cut off.
 
-def call_llm_json(prompt: str, system_prompt: str = None, temperature: float = 0.7) -> dict:
+class JsonObjectScanner:
     """
-    Call LLM and parse the response as JSON
+    Finds where the first valid top-level JSON object in streamed text closes
+
+    A balanced {...} that doesn't parse (a brace in the prose before the
+    JSON) is skipped, and scanning goes on from the next "{".
     """
-    if system_prompt is None:
-        system_prompt = "You are a helpful assistant. Always respond with valid JSON only, no markdown formatting."
+
+    def __init__(self):
+        self.text = ""  # everything fed so far
+        self.pos = 0  # next index of text to scan
+        self.start = -1  # index of the "{" of the current candidate
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, text: str) -> int:
+        """Scan the next chunk; returns the index just past the closing brace in it, or -1"""
+        offset = len(self.text)
+        self.text += text
+        while self.pos < len(self.text):
+            i = self.pos
+            ch = self.text[i]
+            self.pos += 1
+            if self.start < 0:
+                if ch == "{":
+                    self.start = i
+                    self.depth = 1
+            elif self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        json.loads(self.text[self.start:i + 1])
+                        return i + 1 - offset
+                    except json.JSONDecodeError:
+                        # Not the object: try again from the next "{"
+                        self.pos = self.start + 1
+                        self.start = -1
+        return -1
+
+
+PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort fix of a JSON object starting at text[0]
+
+    Drops // and /* */ comments and trailing commas, maps Python's
+    True/False/None, escapes raw newlines inside strings, and stops after
+    the object closes. If the text was cut off, it is rolled back to the
+    last complete member and the open brackets are closed.
+    """
+    return _repair_json(text)[0]
+
+
+def _repair_json(text: str):
+    """repair_json, also returning the path of the member a cut-off object lost (None if it closed)"""
+    out = []
+    stack = []
+    members = []  # per open container: key of the current member (objects) or its index (arrays)
+    cut = None  # (len(out), stack, members) at the last comma: everything before it is complete
+    in_string = escape = expect_key = False
+    key_start = None  # where the key being read starts in out
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if key_start is not None:
+                    try:
+                        members[-1] = json.loads("".join(out[key_start:]) + '"')
+                    except json.JSONDecodeError:
+                        pass
+                    key_start = None
+                    expect_key = False
+            elif ch in "\n\r\t":
+                ch = {"\n": "\\n", "\r": "", "\t": "\\t"}[ch]
+            out.append(ch)
+        elif ch == '"':
+            in_string = True
+            if expect_key:
+                key_start = len(out)
+            out.append(ch)
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            members.append(None if ch == "{" else 0)
+            expect_key = ch == "{"
+            out.append(ch)
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            out.append(stack.pop() if stack else ch)
+            if members:
+                members.pop()
+            expect_key = False
+            if not stack:
+                break
+            cut = (len(out), list(stack), list(members))
+        elif ch == ",":
+            cut = (len(out), list(stack), list(members))
+            if stack and stack[-1] == "}":
+                expect_key = True
+            elif members:
+                members[-1] += 1
+            out.append(ch)
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i)
+            i = n if end < 0 else end + 2
+            continue
+        elif ch.isalpha():
+            j = i
+            while j < n and text[j].isalnum():
+                j += 1
+            word = text[i:j]
+            out.append(PYTHON_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    if not stack:
+        return "".join(out), None
+
+    # Cut off mid-object: keep only members that were complete, and report
+    # the innermost field that lost something (lists count as one field)
+    if cut is not None:
+        depth = len(cut[1])
+        lost = list(members[:depth - 1])
+        if cut[1][-1] == "}" and len(members) >= depth and members[depth - 1] != cut[2][depth - 1]:
+            lost.append(members[depth - 1])
+        del out[cut[0]:]
+        stack = cut[1]
     else:
-        system_prompt += "\n\nAlways respond with valid JSON only, no markdown formatting."
+        lost = []
+        del out[1:]
+        stack = stack[:1]
+    out.extend(reversed(stack))
+
+    path = []
+    for key in lost:
+        if not isinstance(key, str):
+            break
+        path.append(key)
+    return "".join(out), tuple(path)
+
+
+def extract_json(response: str) -> dict:
+    """
+    Parse the first JSON object in a model response, repairing it if needed
+
+    Raises json.JSONDecodeError if there is no object to recover.
+    """
+    return extract_json_repairs(response)[0]
+
+
+def extract_json_repairs(response: str):
+    """
+    extract_json, also returning the paths that were lost to a cut-off
+
+    A brace in prose before the JSON ("Here is {the} answer: {...}") doesn't
+    parse, so each "{" is tried in turn until one does.
+    """
+    start = response.find("{")
+    if start < 0:
+        raise json.JSONDecodeError("No JSON object in response", response, 0)
+    # The first object that parses as is, if any
+    scanner = JsonObjectScanner()
+    end = scanner.feed(response)
+    error = None
+    while start >= 0:
+        if end > 0 and start == scanner.start:
+            return json.loads(response[start:end]), []
+        try:
+            repaired, lost = _repair_json(response[start:])
+            result = json.loads(repaired)
+            return result, ([] if lost is None else [lost])
+        except json.JSONDecodeError as e:
+            error = error or e
+        start = response.find("{", start + 1)
+    raise error
+
+
+def parse_json_response(response: str) -> dict:
+    """
+    Parse a model response as JSON (fences, prose and common defects are tolerated)
+    """
+    return extract_json(response)
+
+
+# ============================================================
+# Field Validation
+# ============================================================
+
+def prompt_template(prompt: str):
+    """The example JSON object a prompt asks for (first object after "JSON"), or None"""
+    start = prompt.find("{", max(0, prompt.find("JSON")))
+    if start < 0:
+        return None
+    try:
+        template = json.loads(repair_json(prompt[start:]))
+    except json.JSONDecodeError:
+        return None
+    return template if isinstance(template, dict) and template else None
+
+
+def normalize_fields(value: dict, template: dict):
+    """Coerce near-misses in place: lists where text is expected are joined, text where a list is expected is wrapped"""
+    for key, expected in template.items():
+        if key not in value:
+            continue
+        actual = value[key]
+        if isinstance(expected, dict) and isinstance(actual, dict):
+            normalize_fields(actual, expected)
+        elif isinstance(expected, str) and isinstance(actual, list) and all(isinstance(v, str) for v in actual):
+            value[key] = ", ".join(actual)
+        elif isinstance(expected, str) and isinstance(actual, (int, float)) and not isinstance(actual, bool):
+            value[key] = str(actual)
+        elif isinstance(expected, list) and isinstance(actual, str):
+            value[key] = [actual]
+
+
+def invalid_fields(value: dict, template: dict, path: tuple = ()) -> list:
+    """
+    Paths of template fields that are missing or of the wrong type in value
+
+    Empty values are fine: a posting may well have no preferred skills or
+    experience requirements, and re-asking won't make some up.
+
+    Nested objects are checked field by field only when every top-level
+    field is one (the multi-section fused requests); elsewhere, like
+    experience_requirements in the job parse, their keys are just examples.
+    """
+    if template is None:
+        return []
+    sections = not path and all(isinstance(v, dict) for v in template.values())
+    invalid = []
+    for key, expected in template.items():
+        field = path + (key,)
+        actual = value.get(key) if isinstance(value, dict) else None
+        if isinstance(expected, dict):
+            if not isinstance(actual, dict):
+                invalid.append(field)
+            elif sections:
+                invalid.extend(invalid_fields(actual, expected, field))
+        elif isinstance(expected, list):
+            if not isinstance(actual, list):
+                invalid.append(field)
+        elif isinstance(expected, str):
+            if not isinstance(actual, str):
+                invalid.append(field)
+        elif actual is None:
+            invalid.append(field)
+    return invalid
+
+
+def _get_path(value, path):
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def _set_path(value, path, field):
+    for key in path[:-1]:
+        if not isinstance(value.get(key), dict):
+            value[key] = {}
+        value = value[key]
+    value[path[-1]] = field
+
+
+def field_prompt(prompt: str, partial: dict, invalid: list, template: dict) -> str:
+    """Prompt that asks only for the invalid fields, given what the model already wrote"""
+    wanted = {}
+    for path in invalid:
+        _set_path(wanted, path, _get_path(template, path))
+    return f"""{prompt}
+
+Your previous answer was missing or had invalid values for: {', '.join('.'.join(p) for p in invalid)}
+This is what you already wrote; keep it consistent but don't repeat it:
+{json.dumps(partial, ensure_ascii=False, indent=2)}
+
+Return JSON with ONLY these fields:
+{json.dumps(wanted, ensure_ascii=False, indent=2)}
+"""
+
+
+def merge_fields(result: dict, fix: dict, invalid: list, lost: list = ()) -> list:
+    """
+    Copy the re-asked fields from fix into result (the model may also return them unnested)
+
+    Fields the fix itself lost to a cut-off are skipped. Returns the paths
+    that were copied.
+    """
+    merged = []
+    for path in invalid:
+        if any(p[:len(path)] == path or path[:len(p)] == p for p in lost if p):
+            continue
+        field = _get_path(fix, path)
+        if field is None:
+            field = fix.get(path[-1])
+        if field is not None:
+            _set_path(result, path, field)
+            merged.append(path)
+    return merged
+
+
+def lost_fields(lost: list, template: dict) -> list:
+    """Template fields that contain the paths a cut-off response lost (see extract_json_repairs)"""
+    fields = []
+    for path in lost:
+        field = ()
+        while len(field) < len(path) and isinstance(_get_path(template, field), dict) \
+                and path[len(field)] in _get_path(template, field):
+            field = path[:len(field) + 1]
+        if field and field not in fields:
+            fields.append(field)
+    return fields
+
+
+# ============================================================
+# Response Cache
+# ============================================================
+
+def cache_key(prompt: str, system_prompt: str = None, temperature: float = 0.7) -> str:
+    """Content hash of everything that determines a response"""
+    payload = json.dumps([MODEL, system_prompt, prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+def cache_get(key: str):
+    """Return the cached response for key, or None"""
+    path = _cache_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if time.time() - entry.get('created_at', 0) > CACHE_MAX_AGE_DAYS * 86400:
+        cache_delete(key)
+        return None
+
+    # mtime doubles as last-access time for LRU eviction
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass  # pruned since it was read
+    return entry['response']
+
+
+_cache_puts = 0
+_cache_puts_lock = threading.Lock()
+
+
+def cache_put(key: str, response: str):
+    global _cache_puts
+    path = _cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'model': MODEL, 'created_at': time.time(), 'response': response}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    # Pruning walks the whole cache, so don't do it on every write
+    with _cache_puts_lock:
+        prune = _cache_puts % max(1, CACHE_PRUNE_EVERY) == 0
+        _cache_puts += 1
+    if prune:
+        prune_cache()
+
+
+def cache_delete(key: str):
+    try:
+        os.remove(_cache_path(key))
+    except FileNotFoundError:
+        pass
+
+
+def prune_cache():
+    """Drop entries older than CACHE_MAX_AGE_DAYS, then least recently used ones until under CACHE_MAX_BYTES"""
+    entries = []
+    now = time.time()
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if name.endswith(".tmp"):
+                continue  # still being written
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - st.st_mtime > CACHE_MAX_AGE_DAYS * 86400:
+                # Another process may be pruning the same cache
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            else:
+                entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= CACHE_MAX_BYTES:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        if total <= CACHE_MAX_BYTES:
+            break
+
+
+# ============================================================
+# Rate Limiting
+# ============================================================
+# One limiter per (base URL, model). Requests and estimated tokens per
+# minute are metered with token buckets, so a long run settles at the
+# quota instead of bursting into 429s. Concurrency is AIMD: one more slot
+# per round of successful calls, halved on a 429, and trimmed when
+# latency climbs well above what the fastest calls predict for a response
+# of that length.
 
-    response = call_llm(prompt, system_prompt, temperature)
+# Completion length assumed until responses have been seen
+DEFAULT_COMPLETION_TOKENS = 600
 
-    # Try to extract JSON from response
-    response = response.strip()
-    if response.startswith("```json"):
-        response = response[7:]
-    if response.startswith("```"):
-        response = response[3:]
-    if response.endswith("```"):
-        response = response[:-3]
-    response = response.strip()
+# Latency this many times the best seen counts as congestion
+LATENCY_FACTOR = 3.0
 
-    return json.loads(response)
+# How often a request waiting for a free slot checks again
+SLOT_POLL_SECONDS = 0.05
+
+
+class TokenBucket:
+    """
+    Allows per_minute units per minute, refilled continuously
+
+    Starts empty: a fresh run paces itself from the first request instead
+    of spending a whole minute's quota in one burst (the provider may be
+    counting requests from an earlier run).
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = 0.0
+        self.updated = time.monotonic()
+
+    def delay(self, amount, now):
+        """Seconds until amount is available"""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A single request bigger than the bucket waits for a full one
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount):
+        # May go negative when a usage report corrects an estimate
+        self.level -= amount
+
+
+class RateLimiter:
+    """Request/token budgets, Retry-After pauses and AIMD concurrency for one endpoint"""
+
+    def __init__(self, rpm=0, tpm=0, max_concurrency=MAX_CONCURRENCY, name=""):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.best_overhead = None  # seconds, fastest call seen
+        self.best_token_latency = None  # seconds per completion token, fastest seen
+        self.last_decrease = 0.0
+        self.completion_tokens = DEFAULT_COMPLETION_TOKENS  # running average
+        self.lock = threading.Lock()
+
+    def set_max_concurrency(self, limit):
+        with self.lock:
+            at_ceiling = self.limit >= self.max_concurrency
+            self.max_concurrency = limit
+            self.limit = float(limit) if at_ceiling else min(self.limit, float(limit))
+
+    def estimate_tokens(self, messages):
+        """Prompt tokens (about 4 characters each) plus the average completion"""
+        chars = sum(len(m["content"]) for m in messages)
+        return chars // 4 + int(self.completion_tokens)
+
+    def try_acquire(self, tokens):
+        """Reserve a slot and budget for one request; returns 0, or how long to wait first"""
+        with self.lock:
+            now = time.monotonic()
+            delay = self.blocked_until - now
+            if self.in_flight >= int(self.limit):
+                delay = max(delay, SLOT_POLL_SECONDS)
+            if self.requests:
+                delay = max(delay, self.requests.delay(1, now))
+            if self.tokens:
+                delay = max(delay, self.tokens.delay(tokens, now))
+            if delay > 0:
+                return delay
+            self.in_flight += 1
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            return 0.0
+
+    def acquire(self, tokens):
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return
+            time.sleep(delay)
+
+    async def aacquire(self, tokens):
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    def release(self, estimated, ok=False, usage=None, latency=None, rate_limited=False, retry_after=None):
+        """
+        Return a slot after a request finished
+
+        usage is the response's token usage, if the server reported it. A
+        failed request (ok=False) has its token estimate refunded.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+
+            completion = self.completion_tokens
+            if not ok:
+                if self.tokens:
+                    self.tokens.take(-estimated)
+            elif usage is not None:
+                if self.tokens:
+                    self.tokens.take(usage.total_tokens - estimated)
+                completion = max(1, usage.completion_tokens or 1)
+                self.completion_tokens += 0.2 * (completion - self.completion_tokens)
+
+            if rate_limited:
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+                # Requests already in flight will likely 429 too: count them as one event
+                if now - self.last_decrease > 1.0 and self.limit > 1:
+                    self.limit = max(1.0, self.limit / 2)
+                    self.last_decrease = now
+                    print(f"⚠️ Rate limited by {self.name}, concurrency now {int(self.limit)}",
+                          file=sys.stderr)
+            elif ok and latency is not None:
+                # Latency is a fixed overhead plus a cost per output token. The
+                # fastest call bounds the first and the fastest per-token rate
+                # the second, so their sum is a generous expectation for a
+                # response of this length; short responses don't look slow.
+                if self.best_overhead is None or latency < self.best_overhead:
+                    self.best_overhead = latency
+                if self.best_token_latency is None or latency / completion < self.best_token_latency:
+                    self.best_token_latency = latency / completion
+                expected = self.best_overhead + self.best_token_latency * completion
+                if latency > LATENCY_FACTOR * expected:
+                    if now - self.last_decrease > 1.0:
+                        self.limit = max(1.0, self.limit * 0.9)
+                        self.last_decrease = now
+                else:
+                    self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+
+_limiters = {}  # (base_url, model) -> RateLimiter
+_limiters_lock = threading.Lock()
+
+
+def rate_limits_for(base_url: str, model: str) -> dict:
+    """Configured {"rpm", "tpm", "concurrency"} for an endpoint"""
+    limits = {"rpm": RATE_LIMIT_RPM, "tpm": RATE_LIMIT_TPM, "concurrency": MAX_CONCURRENCY}
+    for key in [model, base_url, f"{base_url}|{model}"]:
+        limits.update(RATE_LIMITS.get(key, {}))
+    return limits
+
+
+def get_rate_limiter(base_url: str = None, model: str = None) -> RateLimiter:
+    """Shared limiter for base_url/model (default: the configured endpoint)"""
+    key = (base_url or BASE_URL, model or MODEL)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limits = rate_limits_for(*key)
+            limiter = RateLimiter(limits["rpm"], limits["tpm"], max(1, int(limits["concurrency"])),
+                                  name=f"{key[0]} ({key[1]})")
+            _limiters[key] = limiter
+        return limiter
+
+
+def retry_after_seconds(error) -> float:
+    """Seconds from a Retry-After (or retry-after-ms) header, or None"""
+    response = getattr(error, "response", None)
+    headers = response.headers if response is not None else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error) -> bool:
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return isinstance(error, APIConnectionError)
+
+
+def retry_delay(limiter, estimated, error, attempt) -> float:
+    """
+    Release the slot of a failed attempt and return how long to wait before the next
+
+    Re-raises error if it can't be retried or retries are used up.
+    """
+    rate_limited = isinstance(error, APIStatusError) and error.status_code == 429
+    retry_after = retry_after_seconds(error) if rate_limited else None
+    limiter.release(estimated, rate_limited=rate_limited, retry_after=retry_after)
+    if not is_retryable(error) or attempt >= MAX_RETRIES:
+        raise error
+    # Full jitter, on top of Retry-After when the server sent one (the
+    # limiter holds every request until then; the jitter spreads the
+    # restart and keeps growing if the hint turns out to be too short)
+    backoff = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    return (retry_after or 0.0) + backoff
+
+
+def read_stream(chunks, stop_at_json: bool):
+    """Text of a streamed completion; with stop_at_json, only up to where the first JSON object closes"""
+    scanner = JsonObjectScanner() if stop_at_json else None
+    parts = []
+    for chunk in chunks:
+        text = chunk.choices[0].delta.content if chunk.choices else None
+        if not text:
+            continue
+        end = scanner.feed(text) if scanner else -1
+        if end >= 0:
+            parts.append(text[:end])
+            break
+        parts.append(text)
+    return "".join(parts)
+
+
+async def aread_stream(chunks, stop_at_json: bool):
+    """Async version of read_stream"""
+    scanner = JsonObjectScanner() if stop_at_json else None
+    parts = []
+    async for chunk in chunks:
+        text = chunk.choices[0].delta.content if chunk.choices else None
+        if not text:
+            continue
+        end = scanner.feed(text) if scanner else -1
+        if end >= 0:
+            parts.append(text[:end])
+            break
+        parts.append(text)
+    return "".join(parts)
+
+
+def stream_usage(messages: list, content: str):
+    """Token usage for a stream we stopped reading early (the server never reports it)"""
+    prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                           total_tokens=prompt_tokens + completion_tokens)
+
+
+def create_completion(messages: list, temperature: float, stop_at_json: bool = False) -> str:
+    """
+    Send one chat completion through the rate limiter, retrying transient failures
+
+    With stop_at_json, the completion is streamed and the connection
+    closed as soon as the first JSON object in it closes, so whatever the
+    model would have written after it is never generated.
+    """
+    limiter = get_rate_limiter()
+    estimated = limiter.estimate_tokens(messages)
+    attempt = 0
+    while True:
+        limiter.acquire(estimated)
+        started = time.monotonic()
+        try:
+            if stop_at_json:
+                stream = client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True
+                )
+                try:
+                    content = read_stream(stream, stop_at_json)
+                finally:
+                    stream.close()
+                usage = stream_usage(messages, content)
+            else:
+                response = client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    temperature=temperature
+                )
+                content, usage = response.choices[0].message.content, response.usage
+        except Exception as e:
+            time.sleep(retry_delay(limiter, estimated, e, attempt))
+            attempt += 1
+            continue
+        limiter.release(estimated, ok=True, usage=usage, latency=time.monotonic() - started)
+        return content
+
+
+async def acreate_completion(messages: list, temperature: float, stop_at_json: bool = False) -> str:
+    """Async version of create_completion"""
+    limiter = get_rate_limiter()
+    estimated = limiter.estimate_tokens(messages)
+    async_client = get_async_client()
+    attempt = 0
+    while True:
+        await limiter.aacquire(estimated)
+        started = time.monotonic()
+        try:
+            if stop_at_json:
+                stream = await async_client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True
+                )
+                try:
+                    content = await aread_stream(stream, stop_at_json)
+                finally:
+                    await stream.close()
+                usage = stream_usage(messages, content)
+            else:
+                response = await async_client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    temperature=temperature
+                )
+                content, usage = response.choices[0].message.content, response.usage
+        except asyncio.CancelledError:
+            limiter.release(estimated)
+            raise
+        except Exception as e:
+            await asyncio.sleep(retry_delay(limiter, estimated, e, attempt))
+            attempt += 1
+            continue
+        limiter.release(estimated, ok=True, usage=usage, latency=time.monotonic() - started)
+        return content
+
+
+# ============================================================
+# LLM Calls
+# ============================================================
+
+def call_llm(prompt: str, system_prompt: str = None, temperature: float = 0.7, use_cache: bool = True,
+             stop_at_json: bool = False) -> str:
+    """
+    Call LLM with the given prompt
+
+    Responses are cached on disk by (model, system prompt, prompt, temperature).
+    Pass use_cache=False for creative calls where every response should differ.
+    stop_at_json streams the response and stops at the end of the first JSON object.
+    """
+    use_cache = use_cache and CACHE_ENABLED
+    if use_cache:
+        key = cache_key(prompt, system_prompt, temperature)
+        cached = cache_get(key)
+        if cached is not None:
+            return cached
+
+    content = create_completion(build_messages(prompt, system_prompt), temperature, stop_at_json)
+
+    if use_cache:
+        cache_put(key, content)
+    return content
+
+
+def _check_json(prompt: str, result: dict, lost: list = ()):
+    """
+    Normalize result against the prompt's template; returns (template, invalid field paths)
+
+    Fields in lost were cut off mid-value, so they count as invalid even
+    if what was left of them looks fine.
+    """
+    template = prompt_template(prompt)
+    if template is None:
+        return None, []
+    normalize_fields(result, template)
+    invalid = invalid_fields(result, template)
+    return template, invalid + [field for field in lost if field not in invalid]
+
+
+def _finish_json(prompt, system_prompt, temperature, use_cache, result, invalid, reprompted, truncated=False):
+    """Cache a result completed by re-prompts, or warn about fields that are still invalid"""
+    key = cache_key(prompt, system_prompt, temperature)
+    if invalid or truncated:
+        # Don't keep serving an incomplete or cut-off response
+        cache_delete(key)
+    if invalid:
+        print(f"⚠️ LLM response still missing {', '.join('.'.join(p) for p in invalid)} "
+              f"after {FIELD_RETRIES} re-prompts", file=sys.stderr)
+    elif reprompted and use_cache and CACHE_ENABLED and not truncated:
+        cache_put(key, json.dumps(result, ensure_ascii=False))
+    return result
+
+
+def call_llm_json(prompt: str, system_prompt: str = None, temperature: float = 0.7, use_cache: bool = True) -> dict:
+    """
+    Call LLM and parse the response as JSON
+
+    The response is streamed and cut off once the JSON object closes, then
+    extracted and repaired (extract_json). Fields of the prompt's JSON
+    template that are still missing or invalid are asked for again on their
+    own, up to FIELD_RETRIES times, instead of regenerating everything.
+    """
+    system_prompt = json_system_prompt(system_prompt)
+    response = call_llm(prompt, system_prompt, temperature, use_cache, stop_at_json=STREAM_JSON)
+    try:
+        result, truncated = extract_json_repairs(response)
+    except json.JSONDecodeError:
+        # Don't keep serving a response we can't parse
+        cache_delete(cache_key(prompt, system_prompt, temperature))
+        raise
+
+    template = prompt_template(prompt)
+    lost = lost_fields(truncated, template) if template else []
+    _, invalid = _check_json(prompt, result, lost)
+    reprompted = 0
+    while invalid and reprompted < FIELD_RETRIES:
+        reprompted += 1
+        try:
+            response = call_llm(field_prompt(prompt, result, invalid, template), system_prompt,
+                                temperature, use_cache=False, stop_at_json=STREAM_JSON)
+            fix, fix_truncated = extract_json_repairs(response)
+        except json.JSONDecodeError:
+            continue
+        merged = merge_fields(result, fix, invalid, fix_truncated)
+        lost = [field for field in lost if field not in merged]
+        _, invalid = _check_json(prompt, result, lost)
+    return _finish_json(prompt, system_prompt, temperature, use_cache, result, invalid, reprompted, bool(truncated))
+
+
+async def acall_llm(prompt: str, system_prompt: str = None, temperature: float = 0.7, use_cache: bool = True,
+                    stop_at_json: bool = False) -> str:
+    """
+    Async version of call_llm
+
+    At most MAX_CONCURRENCY requests are in flight at once, fewer while the
+    rate limiter is backing off; the rest wait instead of opening more
+    connections. Cache reads and writes (and the occasional prune) run in
+    a worker thread so they don't stall the other requests.
+    """
+    use_cache = use_cache and CACHE_ENABLED
+    if use_cache:
+        key = cache_key(prompt, system_prompt, temperature)
+        cached = await asyncio.to_thread(cache_get, key)
+        if cached is not None:
+            return cached
+
+    content = await acreate_completion(build_messages(prompt, system_prompt), temperature, stop_at_json)
+
+    if use_cache:
+        await asyncio.to_thread(cache_put, key, content)
+    return content
+
+
+async def acall_llm_json(prompt: str, system_prompt: str = None, temperature: float = 0.7, use_cache: bool = True) -> dict:
+    """
+    Async version of call_llm_json
+    """
+    system_prompt = json_system_prompt(system_prompt)
+    response = await acall_llm(prompt, system_prompt, temperature, use_cache, stop_at_json=STREAM_JSON)
+    try:
+        result, truncated = extract_json_repairs(response)
+    except json.JSONDecodeError:
+        await asyncio.to_thread(cache_delete, cache_key(prompt, system_prompt, temperature))
+        raise
+
+    template = prompt_template(prompt)
+    lost = lost_fields(truncated, template) if template else []
+    _, invalid = _check_json(prompt, result, lost)
+    reprompted = 0
+    while invalid and reprompted < FIELD_RETRIES:
+        reprompted += 1
+        try:
+            response = await acall_llm(field_prompt(prompt, result, invalid, template), system_prompt,
+                                       temperature, use_cache=False, stop_at_json=STREAM_JSON)
+            fix, fix_truncated = extract_json_repairs(response)
+        except json.JSONDecodeError:
+            continue
+        merged = merge_fields(result, fix, invalid, fix_truncated)
+        lost = [field for field in lost if field not in merged]
+        _, invalid = _check_json(prompt, result, lost)
+    return await asyncio.to_thread(_finish_json, prompt, system_prompt, temperature, use_cache,
+                                   result, invalid, reprompted, bool(truncated))
+
+
+# ============================================================
+# Batch Files
+# ============================================================
+# Request and result files for the provider's batch endpoint
+# (one JSON object per line, matched up by custom_id).
+
+BATCH_URL = "/v1/chat/completions"
+
+
+def batch_request(custom_id: str, prompt: str, system_prompt: str = None, temperature: float = 0.7) -> dict:
+    """One batch request line for a JSON call, as call_llm_json would send it"""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_URL,
+        "body": {
+            "model": MODEL,
+            "messages": build_messages(prompt, json_system_prompt(system_prompt)),
+            "temperature": temperature
+        }
+    }
+
+
+def write_batch_requests(path: str, requests) -> int:
+    """Write (custom_id, (prompt, system_prompt, temperature)) pairs to a batch request file"""
+    count = 0
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for custom_id, request in requests:
+            f.write(json.dumps(batch_request(custom_id, *request), ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def read_batch_results(path: str) -> dict:
+    """
+    Read a batch result file into {custom_id: parsed JSON}
+
+    Requests that failed, or whose response isn't valid JSON, are left out
+    so they can be sent again.
+    """
+    results = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            if entry.get("error") or response.get("status_code") != 200:
+                continue
+            try:
+                content = response["body"]["choices"][0]["message"]["content"]
+                results[entry["custom_id"]] = parse_json_response(content)
+            except (KeyError, IndexError, TypeError, json.JSONDecodeError):
+                continue
+    return results
 
 
 if __name__ == "__main__":
@@ -0,0 +1,484 @@
+"""
+Mock OpenAI-compatible server for local benchmarks
+- Answers /v1/chat/completions with schema-valid JSON for each prompt in generate_cv_llm
+- Latency, error rate, per-minute quotas and 429 bursts are configurable
+- Streams when asked to, and can cut off or wrap its JSON in prose to test recovery
+- No API key or network needed; point OPENAI_BASE_URL at it
+
+Usage:
+    python3 mock_llm_server.py --port 8765 --latency-ms 800 --rpm 300
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 LLM_CACHE=0 python3 generate_batch.py --job 1 --count 5
+
+    # Drive it through llm_client and report throughput, latency and retries
+    python3 mock_llm_server.py --bench 200 --concurrency 16 --rpm 600 --error-rate 0.02
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8765
+
+# Characters per streamed chunk (roughly a few tokens)
+STREAM_CHUNK_CHARS = 16
+
+# What a chatty model wraps its JSON in (--prose-rate)
+PROSE_BEFORE = "Sure! Here is the JSON you asked for:\n\n```json\n"
+PROSE_AFTER = ("\n```\n\nEach section is tailored to the job requirements above. Let me know if you would "
+               "like me to adjust the tone, add more quantified results, or tailor it to a different role.")
+
+
+# ============================================================
+# Responses
+# ============================================================
+
+COMPANIES = ["Northwind Analytics", "Bluefin Logistics", "Cedar Health Partners", "Summit Retail Group",
+             "Harbor Energy", "Lumen Financial", "Greenline Foods", "Atlas Media"]
+CITIES = ["Chicago, IL", "Austin, TX", "Seattle, WA", "Boston, MA", "Denver, CO", "Atlanta, GA"]
+ROLES = ["Data Analyst Intern", "Business Intelligence Intern", "Operations Analytics Intern",
+         "Reporting Analyst Intern"]
+TASKS = ["Built weekly {tool} dashboards tracking {metric} for {n} regional teams",
+         "Cleaned and joined {n}K rows of sales data in SQL, cutting report prep time by {pct}%",
+         "Automated a monthly {metric} report in Python, saving {n} analyst hours per month",
+         "Analyzed {metric} trends and presented recommendations to {n} stakeholders"]
+AI_TASKS = ["Used ChatGPT to draft SQL queries and summarize {metric} findings, speeding up analysis by {pct}%",
+            "Applied Generative AI tools to classify {n}K customer comments by theme"]
+TOOLS = ["Tableau", "Power BI", "Excel", "Looker"]
+METRICS = ["revenue", "churn", "inventory", "conversion", "on-time delivery"]
+PROJECTS = ["Retail Demand Forecasting", "Hospital Readmission Analysis", "Transit Ridership Dashboard",
+            "Customer Segmentation Study"]
+POSITIONS = [("Treasurer", "Data Analytics Club"), ("Vice President", "Business Society"),
+             ("Lead Tutor", "Statistics Tutoring Center"), ("Events Chair", "Women in Business")]
+ACHIEVEMENTS = [("Dean's List", "Top 10% of the college"), ("1st Place", "Regional Case Competition"),
+                ("Merit Scholarship", "Awarded for academic excellence"), ("Honor Roll", "GPA above 3.7")]
+
+
+def classify(prompt):
+    """Which generate_cv_llm request a prompt is: (kind, exp_ai, proj_ai)"""
+    if prompt.startswith("Analyze the following job description"):
+        return "job", False, False
+    if prompt.startswith("Generate three resume sections"):
+        return "treatment", "It MUST mention" in prompt, "It MUST emphasize" in prompt
+    if prompt.startswith("Generate an extracurricular position of responsibility and an academic"):
+        return "shared", False, False
+    if prompt.startswith("Generate a realistic internship work experience"):
+        return "experience", "MUST mention" in prompt, False
+    if prompt.startswith("Generate a realistic course project"):
+        return "project", False, "MUST emphasize" in prompt
+    if prompt.startswith("Generate a technical skills section"):
+        return "skills", False, False
+    if prompt.startswith("Generate a realistic extracurricular position"):
+        return "position", False, False
+    if prompt.startswith("Generate a realistic academic achievement"):
+        return "achievement", False, False
+    return "text", False, False
+
+
+def fill(rng, template):
+    return template.format(tool=rng.choice(TOOLS), metric=rng.choice(METRICS),
+                           n=rng.randint(3, 40), pct=rng.randint(10, 45))
+
+
+def experience(rng, ai):
+    items = [fill(rng, t) for t in rng.sample(TASKS, 2)]
+    if ai:
+        items.append(fill(rng, rng.choice(AI_TASKS)))
+    return {
+        "company": rng.choice(COMPANIES),
+        "city": rng.choice(CITIES),
+        "role": rng.choice(ROLES),
+        "dates": "May 2024 - Aug 2024",
+        "items": items,
+    }
+
+
+def project(rng, ai):
+    name = rng.choice(PROJECTS)
+    items = [f"Tools: Python, SQL, {rng.choice(TOOLS)}" + (", ChatGPT" if ai else ""),
+             fill(rng, rng.choice(TASKS))]
+    if ai:
+        items.append("Used an LLM to generate and test feature ideas, then validated them against holdout data")
+    return {
+        "name": name + (" with Generative AI" if ai else ""),
+        "description": f"Course project analyzing {rng.choice(METRICS)} data",
+        "dates": "Sep 2024 - Dec 2024",
+        "items": items,
+    }
+
+
+def skills(rng):
+    return {
+        "languages": ", ".join(rng.sample(["Python", "SQL", "R", "SAS", "VBA"], 3)),
+        "tools": ", ".join(rng.sample(TOOLS + ["Git", "Jira"], 4)),
+        "frameworks": ", ".join(rng.sample(["pandas", "NumPy", "dplyr", "ggplot2", "matplotlib"], 3)),
+        "databases": ", ".join(rng.sample(["PostgreSQL", "MySQL", "Snowflake", "BigQuery"], 2)),
+        "soft_skills": "Communication, Stakeholder Management, Problem Solving",
+        "coursework": "Statistics, Database Systems, Data Visualization, Econometrics",
+        "interests": "Supply Chain Analytics, Sports Statistics",
+    }
+
+
+def position(rng):
+    title, org = rng.choice(POSITIONS)
+    return {"title": title, "org": org, "tenure": "2023-2024"}
+
+
+def achievement(rng):
+    title, desc = rng.choice(ACHIEVEMENTS)
+    return {"title": title, "desc": desc, "date": "2024"}
+
+
+def job_requirements(rng):
+    return {
+        "degree_level": ["Bachelor"],
+        "major_families": ["Data Science", "Statistics", "Business Analytics"],
+        "core_skills": ["SQL", "Python", "Excel", "Tableau", "Data Analysis"],
+        "preferred_skills": ["Power BI", "Snowflake"],
+        "experience_requirements": {"bachelor": "0-2 years"},
+        "job_title": "Data Analyst",
+        "industry": rng.choice(["Retail", "Healthcare", "Finance", "Logistics"]),
+        "key_responsibilities": ["Build dashboards", "Analyze trends", "Present findings"],
+    }
+
+
+def respond(prompt, rng):
+    """Response body for a prompt, as the model would write it"""
+    kind, exp_ai, proj_ai = classify(prompt)
+    if kind == "job":
+        content = job_requirements(rng)
+    elif kind == "experience":
+        content = experience(rng, exp_ai)
+    elif kind == "project":
+        content = project(rng, proj_ai)
+    elif kind == "skills":
+        content = skills(rng)
+    elif kind == "position":
+        content = position(rng)
+    elif kind == "achievement":
+        content = achievement(rng)
+    elif kind == "treatment":
+        content = {"experience": experience(rng, exp_ai), "project": project(rng, proj_ai), "skills": skills(rng)}
+    elif kind == "shared":
+        content = {"position": position(rng), "achievement": achievement(rng)}
+    else:
+        return kind, "Hello! This is the mock LLM server."
+    return kind, json.dumps(content, indent=2)
+
+
+# ============================================================
+# Server
+# ============================================================
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=800, latency_sigma=0.5, error_rate=0.0, malformed_rate=0.0,
+                 prose_rate=0.0, rpm=0, tpm=0, burst_every=0, burst_length=0, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.prose_rate = prose_rate
+        self.rpm = rpm
+        self.tpm = tpm
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.started_at = time.monotonic()
+        self.window = deque()  # (time, tokens) of accepted requests in the last minute
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        super().__init__(address, RequestHandler)
+
+    def latency(self):
+        """Seconds to wait before answering: lognormal around latency_ms (sigma 0 = fixed)"""
+        with self.lock:
+            factor = self.rng.lognormvariate(0, self.latency_sigma) if self.latency_sigma else 1.0
+        return self.latency_ms / 1000 * factor
+
+    def admit(self, tokens):
+        """
+        Count a request against the quota
+
+        Returns None if it may proceed, else (status, retry_after, message).
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.rng.random() < self.error_rate:
+                return 500, None, "Mock server error"
+
+            if self.burst_every:
+                into = (now - self.started_at) % self.burst_every
+                if into < self.burst_length:
+                    return 429, self.burst_length - into, "Rate limit burst"
+
+            while self.window and now - self.window[0][0] >= 60:
+                self.window.popleft()
+            used = sum(t for _, t in self.window)
+            if (self.rpm and len(self.window) >= self.rpm) or (self.tpm and used + tokens > self.tpm):
+                # Retry once the oldest request in the window ages out
+                retry_after = 60 - (now - self.window[0][0]) if self.window else 1.0
+                return 429, retry_after, "Rate limit reached for requests"
+            self.window.append((now, tokens))
+            return None
+
+    def record(self, key, count=1):
+        with self.lock:
+            self.stats[key] += count
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self.send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/stats"):
+            with self.server.lock:
+                self.send_json(200, dict(self.server.stats))
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        messages = request.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+
+        refused = server.admit(prompt_tokens)
+        if refused is not None:
+            status, retry_after, message = refused
+            server.record(status)
+            headers = {"Retry-After": str(math.ceil(retry_after))} if retry_after is not None else None
+            self.send_json(status, {"error": {"message": message, "type": "mock_error", "code": status}}, headers)
+            return
+
+        # Same prompt + seed gives the same answer, so runs are reproducible
+        digest = hashlib.sha256(f"{server.seed}|{prompt}".encode("utf-8")).hexdigest()
+        rng = random.Random(digest if server.seed is not None else None)
+        kind, content = respond(prompt, rng)
+        if server.malformed_rate and rng.random() < server.malformed_rate:
+            content = content[:len(content) * 2 // 3]  # cut off mid-object
+            kind += "/malformed"
+        elif server.prose_rate and rng.random() < server.prose_rate:
+            content = PROSE_BEFORE + content + PROSE_AFTER
+            kind += "/prose"
+        server.record(kind)
+
+        if request.get("stream"):
+            self.stream(request, content, digest)
+            return
+
+        time.sleep(server.latency())
+        server.record(200)
+
+        completion_tokens = len(content) // 4
+        self.send_json(200, {
+            "id": "chatcmpl-mock-" + digest[:12],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+
+    def stream(self, request, content, digest):
+        """Send content as server-sent chat.completion.chunk events, spread over the latency"""
+        server = self.server
+        latency = server.latency()
+        chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        # Time to first token, then the rest of the latency spread over the chunks
+        time.sleep(latency * 0.3)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": "chatcmpl-mock-" + digest[:12],
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        sent = 0
+        try:
+            event({"role": "assistant", "content": ""})
+            for text in chunks:
+                event({"content": text})
+                sent += len(text)
+                time.sleep(latency * 0.7 / max(1, len(chunks)))
+            event({}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client stopped reading once it had what it needed
+            server.record("stream_closed_early")
+            server.record("chars_not_sent", len(content) - sent)
+        server.record(200)
+        server.record("chars_sent", sent)
+
+
+def start_server(port=DEFAULT_PORT, host="127.0.0.1", **options):
+    """Start a MockLLMServer in a background thread; returns the server"""
+    server = MockLLMServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def benchmark(server, count, concurrency):
+    """Send count requests through llm_client at the mock server and report what happened"""
+    os.environ["OPENAI_BASE_URL"] = f"http://{server.server_address[0]}:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    os.environ["LLM_CACHE"] = "0"
+    import asyncio
+    import llm_client
+    from generate_cv_llm import _experience_with_ai_request, _skills_request, _position_request
+
+    llm_client.set_max_concurrency(concurrency)
+    job_info = {"job_title": "Data Analyst", "industry": "Retail", "core_skills": ["SQL", "Python"]}
+    requests = [_experience_with_ai_request(job_info), _skills_request(job_info, skill_bias="database-heavy"),
+                _position_request(job_info)]
+
+    async def run():
+        latencies, failures = [], 0
+
+        async def one(i):
+            nonlocal failures
+            started = time.monotonic()
+            try:
+                await llm_client.acall_llm_json(*requests[i % len(requests)], use_cache=False)
+                latencies.append(time.monotonic() - started)
+            except Exception:
+                failures += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(one(i) for i in range(count)))
+        return time.monotonic() - started, sorted(latencies), failures
+
+    elapsed, latencies, failures = asyncio.run(run())
+    stats = server.stats
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else float("nan")
+
+    print(f"\n{'='*60}")
+    print(f"Mock LLM Benchmark ({count} calls, concurrency {concurrency})")
+    print(f"{'='*60}")
+    print(f"  Elapsed:      {elapsed:.2f}s")
+    print(f"  Throughput:   {len(latencies) / elapsed * 60:.0f} calls/min")
+    print(f"  Latency:      p50 {percentile(0.5):.2f}s  p95 {percentile(0.95):.2f}s  max {percentile(1.0):.2f}s")
+    print(f"  Server:       {stats[200]} ok, {stats[429]} rate limited, {stats[500]} errors")
+    if stats["chars_sent"]:
+        print(f"  Streaming:    {stats['stream_closed_early']} streams closed early, "
+              f"{stats['chars_not_sent']} of {stats['chars_sent'] + stats['chars_not_sent']} chars never sent")
+    malformed = sum(n for k, n in stats.items() if str(k).endswith("/malformed"))
+    prose = sum(n for k, n in stats.items() if str(k).endswith("/prose"))
+    if malformed or prose:
+        print(f"  Defects:      {malformed} truncated, {prose} wrapped in prose")
+    print(f"  Failed calls: {failures}")
+    print(f"  Concurrency:  {llm_client.get_rate_limiter().limit:.1f} at the end (AIMD)")
+
+
+# ============================================================
+# Main
+# ============================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Mock OpenAI-compatible server for local benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'Port to listen on (default: {DEFAULT_PORT}; 0 = any free port)')
+    parser.add_argument('--latency-ms', type=float, default=800,
+                        help='Median response time in ms (default: 800)')
+    parser.add_argument('--latency-sigma', type=float, default=0.5,
+                        help='Lognormal spread of response times; 0 = always --latency-ms (default: 0.5)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with a 500 (default: 0)')
+    parser.add_argument('--malformed-rate', type=float, default=0.0,
+                        help='Fraction of responses cut off mid-JSON (default: 0)')
+    parser.add_argument('--prose-rate', type=float, default=0.0,
+                        help='Fraction of responses wrapped in a fence and chatty prose (default: 0)')
+    parser.add_argument('--rpm', type=int, default=0,
+                        help='Requests per minute before 429s, with Retry-After (default: 0, unlimited)')
+    parser.add_argument('--tpm', type=int, default=0,
+                        help='Prompt tokens per minute before 429s (default: 0, unlimited)')
+    parser.add_argument('--burst-every', type=float, default=0,
+                        help='Start a 429 burst every this many seconds (default: 0, none)')
+    parser.add_argument('--burst-length', type=float, default=2,
+                        help='Seconds each 429 burst lasts (default: 2)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for reproducible latencies, errors and content')
+    parser.add_argument('--bench', type=int, metavar='N', default=0,
+                        help='Start the server in-process, send N calls through llm_client and report')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Max in-flight calls for --bench (default: 8)')
+    args = parser.parse_args()
+
+    options = dict(
+        latency_ms=args.latency_ms, latency_sigma=args.latency_sigma, error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate, prose_rate=args.prose_rate, rpm=args.rpm, tpm=args.tpm,
+        burst_every=args.burst_every, burst_length=args.burst_length, seed=args.seed
+    )
+
+    if args.bench:
+        server = start_server(0 if args.port == DEFAULT_PORT else args.port, args.host, **options)
+        benchmark(server, args.bench, args.concurrency)
+        server.shutdown()
+        sys.exit(0)
+
+    server = MockLLMServer((args.host, args.port), **options)
+    print(f"Mock LLM server on http://{args.host}:{server.server_address[1]}/v1")
+    print(f"   export OPENAI_BASE_URL=http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nServed: {dict(server.stats)}")
@@ -1,39 +1,103 @@
 import json
 import re
 import csv
+import sys
+import time
+import argparse
+import contextlib
+
+
+def compile_matcher(patterns, flags=0):
+    """
+    把多个正则合成一个，扫描一遍就能找出所有命中的 pattern（包括重叠的）
+
+    每个位置先用 gate 判断有没有任何 pattern 能匹配，再用一串可选的
+    lookahead 分别记录命中了哪几个，所以结果和逐个 re.search 一致。
+    """
+    gate = '(?=' + '|'.join(f'(?:{p})' for p in patterns) + ')'
+    probes = ''.join(f'(?:(?=({p})))?' for p in patterns)
+    return re.compile(gate + probes, flags)
+
+
+def find_matches(matcher, text):
+    """返回命中的 pattern 下标集合"""
+    found = set()
+    for m in matcher.finditer(text):
+        for i, group in enumerate(m.groups()):
+            if group is not None:
+                found.add(i)
+    return found
+
+
+# 学历：在小写文本上匹配
+EDUCATION_LEVELS = [
+    ('PhD/Doctorate', r'phd|ph\.d|doctorate'),
+    ("Master's", r"master'?s|ms\b|m\.s\.|mba|m\.a\."),
+    ("Bachelor's", r"bachelor'?s|bs\b|b\.s\.|ba\b|b\.a\."),
+    ("Associate's", r"associate'?s"),
+]
+EDUCATION_MATCHER = compile_matcher([p for _, p in EDUCATION_LEVELS])
+
+# 专业关键词
+MAJOR_KEYWORDS = [
+    'Computer Science', 'Data Science', 'Statistics', 'Mathematics', 'Math',
+    'Information Systems', 'Information Technology', 'IT',
+    'Business Administration', 'Finance', 'Accounting', 'Economics',
+    'Engineering', 'Physics', 'Chemistry', 'Biology',
+    'Management Information Systems', 'MIS',
+    'Data Analytics', 'Analytics',
+    'Quantitative', 'STEM',
+]
+MAJOR_MATCHER = compile_matcher([r'\b' + re.escape(k) + r'\b' for k in MAJOR_KEYWORDS], re.IGNORECASE)
+
+DEGREE_IN_PATTERNS = [
+    re.compile(r"(?:degree|bachelor'?s?|master'?s?|bs|ba|ms|mba|phd)\s+(?:in|of)\s+([A-Za-z\s,&]+?)(?:\.|,|;|or|and|\s+with|\s+required|\s+preferred)", re.IGNORECASE),
+    re.compile(r"(?:background|major|field)\s+(?:in)\s+([A-Za-z\s,&]+?)(?:\.|,|;|or|and|\s+is|\s+required)", re.IGNORECASE),
+]
+
+# 经验年限
+YEAR_PATTERNS = [
+    re.compile(r"(\d+)\+?\s*(?:years?|yrs?)\s+(?:of\s+)?(?:experience|exp)", re.IGNORECASE),
+    re.compile(r"(\d+)\s*-\s*(\d+)\s*(?:years?|yrs?)\s+(?:of\s+)?(?:experience|exp)", re.IGNORECASE),
+    re.compile(r"(?:minimum|at least|required)\s+(\d+)\+?\s*(?:years?|yrs?)", re.IGNORECASE),
+    re.compile(r"(\d+)\+?\s*(?:years?|yrs?)\s+(?:of\s+)?(?:work|professional|related)", re.IGNORECASE),
+]
+
+# entry 还是 senior
+SENIORITY_LEVELS = [
+    ('Entry-level', r'\bentry[- ]?level\b'),
+    ('Senior', r'\bsenior\b'),
+    ('Junior', r'\bjunior\b'),
+    ('Early Career', r'\bearly career\b'),
+]
+SENIORITY_MATCHER = compile_matcher([p for _, p in SENIORITY_LEVELS], re.IGNORECASE)
+
+# todo: ai 生成的一个映射表，后续可能需要扩充，目前看基本够用
+# 每个关键词标明查的是 intro（描述前 500 字）还是 company（公司名）
+INDUSTRY_KEYWORDS = {
+    'Technology/Software': [('software', 'intro'), ('saas', 'intro'), ('tech company', 'intro')],
+    'Finance/Banking': [('bank', 'company'), ('financial services', 'intro'), ('hedge fund', 'intro'), ('brokerage', 'intro'), ('investment', 'company')],
+    'Healthcare/Medical': [('medical', 'company'), ('healthcare', 'intro'), ('hospital', 'company'), ('pharmaceutical', 'intro')],
+    'Manufacturing': [('manufacturing', 'intro'), ('manufactur', 'company')],
+    'Semiconductor': [('semiconductor', 'intro'), ('wafer', 'intro')],
+    'Energy': [('energy', 'company'), ('hitachi energy', 'company')],
+    'Defense/Aerospace': [('defense', 'company'), ('military', 'intro'), ('aerospace', 'company')],
+    'Consulting': [('consulting', 'company'), ('consultant', 'company')],
+    'Education/University': [('university', 'company'), ('college', 'company')],
+    'Agriculture': [('agriculture', 'intro'), ('crop', 'intro'), ('vanguard', 'company')],
+    'Construction': [('construction', 'company'), ('contracting corp', 'company')],
+    'Government': [('state agency', 'intro'), ('government', 'intro')],
+}
+INTRO_KEYWORDS = sorted({k for checks in INDUSTRY_KEYWORDS.values() for k, where in checks if where == 'intro'})
+COMPANY_KEYWORDS = sorted({k for checks in INDUSTRY_KEYWORDS.values() for k, where in checks if where == 'company'})
+INTRO_MATCHER = compile_matcher([re.escape(k) for k in INTRO_KEYWORDS])
+COMPANY_MATCHER = compile_matcher([re.escape(k) for k in COMPANY_KEYWORDS])
 
 
 def extract_education(text):
     # 学历
-    education_patterns = [
-        r"(PhD|Ph\.D\.?|Doctorate)",
-        r"(Master'?s?\s*(?:degree|'s)?|MS|M\.S\.|MBA|M\.A\.)",
-        r"(Bachelor'?s?\s*(?:degree|'s)?|BS|B\.S\.|BA|B\.A\.)",
-        r"(Associate'?s?\s*(?:degree)?)",
-    ]
-
-    education_levels = []
-    text_lower = text.lower()
-
-    if re.search(r'phd|ph\.d|doctorate', text_lower):
-        education_levels.append('PhD/Doctorate')
-    if re.search(r"master'?s|ms\b|m\.s\.|mba|m\.a\.", text_lower):
-        education_levels.append("Master's")
-    if re.search(r"bachelor'?s|bs\b|b\.s\.|ba\b|b\.a\.", text_lower):
-        education_levels.append("Bachelor's")
-    if re.search(r"associate'?s", text_lower):
-        education_levels.append("Associate's")
-
-    edu_sentences = []
-    patterns = [
-        r"(?:require|preferred|minimum|qualification)[^.]*(?:degree|bachelor|master|phd)[^.]*\.",
-        r"(?:bachelor|master|phd|degree)[^.]*(?:require|preferred|in\s+\w+)[^.]*\.",
-        r"\b(?:BS|BA|MS|MBA|PhD)[^.]*(?:degree|required|preferred)[^.]*\.",
-    ]
-
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        edu_sentences.extend(matches)
+    found = find_matches(EDUCATION_MATCHER, text.lower())
+    education_levels = [level for i, (level, _) in enumerate(EDUCATION_LEVELS) if i in found]
 
     if education_levels:
         return ', '.join(education_levels)
@@ -44,30 +108,16 @@ def extract_major(text):
     # 专业
     majors = []
 
-    major_keywords = [
-        'Computer Science', 'Data Science', 'Statistics', 'Mathematics', 'Math',
-        'Information Systems', 'Information Technology', 'IT',
-        'Business Administration', 'Finance', 'Accounting', 'Economics',
-        'Engineering', 'Physics', 'Chemistry', 'Biology',
-        'Management Information Systems', 'MIS',
-        'Data Analytics', 'Analytics',
-        'Quantitative', 'STEM',
-    ]
-
-    degree_in_patterns = [
-        r"(?:degree|bachelor'?s?|master'?s?|bs|ba|ms|mba|phd)\s+(?:in|of)\s+([A-Za-z\s,&]+?)(?:\.|,|;|or|and|\s+with|\s+required|\s+preferred)",
-        r"(?:background|major|field)\s+(?:in)\s+([A-Za-z\s,&]+?)(?:\.|,|;|or|and|\s+is|\s+required)",
-    ]
-
-    for pattern in degree_in_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    for pattern in DEGREE_IN_PATTERNS:
+        matches = pattern.findall(text)
         for match in matches:
             cleaned = match.strip()
             if len(cleaned) > 3 and len(cleaned) < 100:
                 majors.append(cleaned)
 
-    for keyword in major_keywords:
-        if re.search(r'\b' + re.escape(keyword) + r'\b', text, re.IGNORECASE):
+    found = find_matches(MAJOR_MATCHER, text)
+    for i, keyword in enumerate(MAJOR_KEYWORDS):
+        if i in found:
             if keyword not in majors:
                 majors.append(keyword)
 
@@ -87,15 +137,8 @@ def extract_experience(text):
     # 经验
     experience_info = []
 
-    year_patterns = [
-        r"(\d+)\+?\s*(?:years?|yrs?)\s+(?:of\s+)?(?:experience|exp)",
-        r"(\d+)\s*-\s*(\d+)\s*(?:years?|yrs?)\s+(?:of\s+)?(?:experience|exp)",
-        r"(?:minimum|at least|required)\s+(\d+)\+?\s*(?:years?|yrs?)",
-        r"(\d+)\+?\s*(?:years?|yrs?)\s+(?:of\s+)?(?:work|professional|related)",
-    ]
-
-    for pattern in year_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    for pattern in YEAR_PATTERNS:
+        matches = pattern.findall(text)
         for match in matches:
             if isinstance(match, tuple):
                 experience_info.append(f"{match[0]}-{match[1]} years")
@@ -103,14 +146,10 @@ def extract_experience(text):
                 experience_info.append(f"{match}+ years")
 
     # entry 还是 senior
-    if re.search(r'\bentry[- ]?level\b', text, re.IGNORECASE):
-        experience_info.append('Entry-level')
-    if re.search(r'\bsenior\b', text, re.IGNORECASE):
-        experience_info.append('Senior')
-    if re.search(r'\bjunior\b', text, re.IGNORECASE):
-        experience_info.append('Junior')
-    if re.search(r'\bearly career\b', text, re.IGNORECASE):
-        experience_info.append('Early Career')
+    found = find_matches(SENIORITY_MATCHER, text)
+    for i, (level, _) in enumerate(SENIORITY_LEVELS):
+        if i in found:
+            experience_info.append(level)
 
     seen = set()
     unique = []
@@ -126,91 +165,187 @@ def extract_industry(text, company, job_title):
     # 行业
     industries = []
 
-    company_lower = company.lower()
-    intro_text = text[:500].lower()
-
-    # todo: ai 生成的一个映射表，后续可能需要扩充，目前看基本够用
-    industry_keywords = {
-        'Technology/Software': [('software', intro_text), ('saas', intro_text), ('tech company', intro_text)],
-        'Finance/Banking': [('bank', company_lower), ('financial services', intro_text), ('hedge fund', intro_text), ('brokerage', intro_text), ('investment', company_lower)],
-        'Healthcare/Medical': [('medical', company_lower), ('healthcare', intro_text), ('hospital', company_lower), ('pharmaceutical', intro_text)],
-        'Manufacturing': [('manufacturing', intro_text), ('manufactur', company_lower)],
-        'Semiconductor': [('semiconductor', intro_text), ('wafer', intro_text)],
-        'Energy': [('energy', company_lower), ('hitachi energy', company_lower)],
-        'Defense/Aerospace': [('defense', company_lower), ('military', intro_text), ('aerospace', company_lower)],
-        'Consulting': [('consulting', company_lower), ('consultant', company_lower)],
-        'Education/University': [('university', company_lower), ('college', company_lower)],
-        'Agriculture': [('agriculture', intro_text), ('crop', intro_text), ('vanguard', company_lower)],
-        'Construction': [('construction', company_lower), ('contracting corp', company_lower)],
-        'Government': [('state agency', intro_text), ('government', intro_text)],
+    found = {
+        'intro': {INTRO_KEYWORDS[i] for i in find_matches(INTRO_MATCHER, text[:500].lower())},
+        'company': {COMPANY_KEYWORDS[i] for i in find_matches(COMPANY_MATCHER, company.lower())},
     }
 
-    for industry, checks in industry_keywords.items():
-        for keyword, search_text in checks:
-            if keyword in search_text:
-                if industry not in industries:
-                    industries.append(industry)
-                break
+    for industry, checks in INDUSTRY_KEYWORDS.items():
+        if any(keyword in found[where] for keyword, where in checks):
+            industries.append(industry)
 
     return ', '.join(industries[:2]) if industries else ''
 
 
-def process_jobs(input_file, output_csv, output_json):
+def iter_jobs(input_file):
+    """
+    Yield jobs one at a time from NDJSON (one object per line, "-" for stdin)
+    or, for older files, from a single JSON array.
+    """
+    if input_file == '-':
+        for line in sys.stdin:
+            if line.strip():
+                yield json.loads(line)
+        return
 
     with open(input_file, 'r', encoding='utf-8') as f:
-        jobs = json.load(f)
-
-    results = []
-
-    for job in jobs:
-        desc = job.get('full_description', '')
-        title = job.get('job_title', '')
-        company = job.get('company', '')
-
-        result = {
-            'job_title': title,
-            'company': company,
-            'location': job.get('location', ''),
-            'salary': job.get('salary', ''),
-            'job_type': job.get('job_type', ''),
-            'education': extract_education(desc),
-            'major': extract_major(desc),
-            'experience': extract_experience(desc),
-            'industry': extract_industry(desc, company, title),
-            'apply_method': job.get('apply_method', ''),
-            'apply_url': job.get('apply_url', ''),
-            'url': job.get('url', ''),
-        }
-        results.append(result)
-
-        # 打印摘要
-        print(f"\n{'='*60}")
-        print(f"职位: {title}")
-        print(f"公司: {company}")
-        print(f"学历: {result['education'] or '未明确'}")
-        print(f"专业: {result['major'] or '未明确'}")
-        print(f"经验: {result['experience'] or '未明确'}")
-        print(f"行业: {result['industry'] or '未明确'}")
-
-    # 保存 CSV
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == '[':
+            # JSON 数组只能整体读入
+            f.seek(0)
+            yield from json.load(f)
+            return
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def process_jobs(input_file, output_csv, output_json, output_ndjson=None):
+
     fieldnames = ['job_title', 'company', 'location', 'salary', 'job_type',
                   'education', 'major', 'experience', 'industry',
                   'apply_method', 'apply_url', 'url']
 
-    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
-
-    # 保存 JSON
-    with open(output_json, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    csv_file = open(output_csv, 'w', newline='', encoding='utf-8')
+    json_file = open(output_json, 'w', encoding='utf-8') if output_json else None
+    # output_ndjson 可以是路径，也可以是已打开的流（比如 stdout）
+    if hasattr(output_ndjson, 'write'):
+        ndjson_file = output_ndjson
+    else:
+        ndjson_file = open(output_ndjson, 'w', encoding='utf-8') if output_ndjson else None
+
+    writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+    writer.writeheader()
+
+    count = 0
+    try:
+        for job in iter_jobs(input_file):
+            desc = job.get('full_description', '')
+            title = job.get('job_title', '')
+            company = job.get('company', '')
+
+            result = {
+                'job_title': title,
+                'company': company,
+                'location': job.get('location', ''),
+                'salary': job.get('salary', ''),
+                'job_type': job.get('job_type', ''),
+                'education': extract_education(desc),
+                'major': extract_major(desc),
+                'experience': extract_experience(desc),
+                'industry': extract_industry(desc, company, title),
+                'apply_method': job.get('apply_method', ''),
+                'apply_url': job.get('apply_url', ''),
+                'url': job.get('url', ''),
+            }
+
+            # 边读边写，不在内存里攒结果
+            writer.writerow(result)
+            if json_file:
+                # 和 json.dump(results, indent=2) 的输出一致
+                item = json.dumps(result, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                json_file.write((',\n  ' if count else '[\n  ') + item)
+            if ndjson_file:
+                ndjson_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+                ndjson_file.flush()
+            count += 1
+
+            # 打印摘要
+            print(f"\n{'='*60}")
+            print(f"职位: {title}")
+            print(f"公司: {company}")
+            print(f"学历: {result['education'] or '未明确'}")
+            print(f"专业: {result['major'] or '未明确'}")
+            print(f"经验: {result['experience'] or '未明确'}")
+            print(f"行业: {result['industry'] or '未明确'}")
+    finally:
+        csv_file.close()
+        if json_file:
+            json_file.write('\n]' if count else '[]')
+            json_file.close()
+        if ndjson_file and ndjson_file is not output_ndjson:
+            ndjson_file.close()
 
     print(f"\n{'='*60}")
-    print(f"处理完成！共 {len(results)} 个职位")
+    print(f"处理完成！共 {count} 个职位")
     print(f"CSV 输出: {output_csv}")
-    print(f"JSON 输出: {output_json}")
+    if output_json:
+        print(f"JSON 输出: {output_json}")
+    if output_ndjson:
+        print(f"NDJSON 输出: {getattr(output_ndjson, 'name', output_ndjson)}")
+
+
+def scan_keywords_one_by_one(text, company):
+    """旧做法：每个关键词单独扫一遍描述，只用于 benchmark 对比。返回 (结果, 扫描次数)"""
+    text_lower = text.lower()
+    intro_text = text[:500].lower()
+    company_lower = company.lower()
+    education = [level for level, p in EDUCATION_LEVELS if re.search(p, text_lower)]
+    majors = [k for k in MAJOR_KEYWORDS if re.search(r'\b' + re.escape(k) + r'\b', text, re.IGNORECASE)]
+    seniority = [level for level, p in SENIORITY_LEVELS if re.search(p, text, re.IGNORECASE)]
+    intro = [k for k in INTRO_KEYWORDS if k in intro_text]
+    company_hits = [k for k in COMPANY_KEYWORDS if k in company_lower]
+    scans = len(EDUCATION_LEVELS) + len(MAJOR_KEYWORDS) + len(SENIORITY_LEVELS) + len(INTRO_KEYWORDS) + len(COMPANY_KEYWORDS)
+    return (education, majors, seniority, intro, company_hits), scans
+
+
+def scan_keywords(text, company):
+    """新做法：每类关键词各一个合成的正则"""
+    education = [level for i, (level, _) in enumerate(EDUCATION_LEVELS) if i in find_matches(EDUCATION_MATCHER, text.lower())]
+    found = find_matches(MAJOR_MATCHER, text)
+    majors = [k for i, k in enumerate(MAJOR_KEYWORDS) if i in found]
+    found = find_matches(SENIORITY_MATCHER, text)
+    seniority = [level for i, (level, _) in enumerate(SENIORITY_LEVELS) if i in found]
+    intro = [INTRO_KEYWORDS[i] for i in sorted(find_matches(INTRO_MATCHER, text[:500].lower()))]
+    company_hits = [COMPANY_KEYWORDS[i] for i in sorted(find_matches(COMPANY_MATCHER, company.lower()))]
+    return (education, majors, seniority, intro, company_hits), 5
+
+
+def benchmark(input_file, rounds=3):
+    jobs = [(job.get('full_description') or '', job.get('company') or '') for job in iter_jobs(input_file)]
+    print(f"Benchmark: {len(jobs)} descriptions, best of {rounds} rounds")
+
+    mismatches = sum(1 for desc, company in jobs
+                     if scan_keywords(desc, company)[0] != scan_keywords_one_by_one(desc, company)[0])
+
+    for label, fn in [('one by one', scan_keywords_one_by_one), ('compiled', scan_keywords)]:
+        best = None
+        for _ in range(rounds):
+            re.purge()  # 旧做法每次都要重新编译
+            start = time.perf_counter()
+            scans = sum(fn(desc, company)[1] for desc, company in jobs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"  {label:<11} {best * 1e6 / len(jobs):8.1f} us/description, "
+              f"{scans / len(jobs):.0f} scans/description")
+    print(f"  mismatched results: {mismatches}")
 
 
 if __name__ == '__main__':
-    process_jobs('jobs_output.json', 'jobs_parsed.csv', 'jobs_parsed.json')
+    parser = argparse.ArgumentParser(description='Parse requirements from extracted jobs')
+    parser.add_argument('input', nargs='?', default='jobs_output.json',
+                        help='JSON array or NDJSON file of jobs, "-" for NDJSON on stdin')
+    parser.add_argument('--csv', default='jobs_parsed.csv')
+    parser.add_argument('--json', default='jobs_parsed.json',
+                        help='JSON array output ("" to skip)')
+    parser.add_argument('--ndjson', default=None,
+                        help='NDJSON output, one job per line ("-" for stdout)')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Compare per-keyword scans with the compiled matchers on the input and exit')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.input)
+        sys.exit(0)
+
+    # NDJSON 输出到 stdout 时，日志改走 stderr
+    ndjson_out = args.ndjson
+    log_stream = contextlib.nullcontext()
+    if args.ndjson == '-':
+        ndjson_out = sys.stdout
+        log_stream = contextlib.redirect_stdout(sys.stderr)
+    with log_stream:
+        process_jobs(args.input, args.csv, args.json or None, ndjson_out)
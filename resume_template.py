@@ -0,0 +1,433 @@
+"""
+Shared LaTeX resume template
+- The preamble and section skeletons are split into static fragments once, at import
+- A resume is rendered by filling a pre-sized list of fragments and joining it once
+"""
+
+import argparse
+import random
+import re
+import time
+
+SLOT_PATTERN = re.compile(r"<<(\w+)>>")
+
+
+# Backslash, tilde and caret would otherwise start a command, become a
+# space or a superscript. Braces come before ~ and ^ so their {} survive
+LATEX_ESCAPES = str.maketrans({
+    '%': '\\%',
+    '$': '\\$',
+    '&': '\\&',
+    '#': '\\#',
+    '_': '\\_',
+    '{': '\\{',
+    '}': '\\}',
+    '~': '\\textasciitilde{}',
+    '^': '\\textasciicircum{}',
+    '\\': '\\textbackslash{}',
+})
+
+# Same table minus backslash, for the replace fast path
+_ESCAPE_PAIRS = tuple((chr(c), v) for c, v in LATEX_ESCAPES.items() if c != ord('\\'))
+
+
+def escape_latex(text):
+    """
+    Escape LaTeX special characters in text
+
+    str.translate with multi-character replacements goes through CPython's
+    slow path, so it's only used when a backslash is present (a sequential
+    replace would re-escape the output). Otherwise each character is
+    replaced only if it occurs, and most fields contain none at all.
+    """
+    text = str(text)
+    if '\\' in text:
+        return text.translate(LATEX_ESCAPES)
+    for old, new in _ESCAPE_PAIRS:
+        if old in text:
+            text = text.replace(old, new)
+    return text
+
+
+def escape_latex_replace(text):
+    """Previous replace-loop escaping, kept for the benchmark below"""
+    replacements = {
+        '%': '\\%',
+        '$': '\\$',
+        '&': '\\&',
+        '#': '\\#',
+        '_': '\\_',
+        '{': '\\{',
+        '}': '\\}',
+    }
+    for old, new in replacements.items():
+        text = str(text).replace(old, new)
+    return text
+
+
+def compile_template(text):
+    """Split text on <<slot>> markers into (static fragments, slot names)"""
+    pieces = SLOT_PATTERN.split(text)
+    return pieces[0::2], pieces[1::2]
+
+
+def fill(template, values):
+    """Render a compiled template; values are given in slot order"""
+    statics, slots = template
+    parts = [None] * (len(statics) + len(slots))
+    parts[0::2] = statics
+    parts[1::2] = values
+    return "".join(parts)
+
+
+# ============================================================
+# Template
+# ============================================================
+
+PREAMBLE = r"""%-------------------------
+% Auto-Generated Resume (LLM-Enhanced)
+%------------------------
+
+\documentclass[a4paper,11pt]{article}
+\usepackage{latexsym}
+\usepackage{xcolor}
+\usepackage{float}
+\usepackage{ragged2e}
+\usepackage[empty]{fullpage}
+\usepackage{wrapfig}
+\usepackage{lipsum}
+\usepackage{tabularx}
+\usepackage{titlesec}
+\usepackage{geometry}
+\usepackage{marvosym}
+\usepackage{verbatim}
+\usepackage{enumitem}
+\usepackage[hidelinks]{hyperref}
+\usepackage{fancyhdr}
+\usepackage{fontawesome5}
+\usepackage{multicol}
+\usepackage{graphicx}
+\usepackage{cfr-lm}
+\usepackage[T1]{fontenc}
+\setlength{\multicolsep}{0pt}
+\pagestyle{fancy}
+\fancyhf{}
+\fancyfoot{}
+\renewcommand{\headrulewidth}{0pt}
+\renewcommand{\footrulewidth}{0pt}
+\geometry{left=1.4cm, top=0.8cm, right=1.2cm, bottom=1cm}
+
+\usepackage[most]{tcolorbox}
+\tcbset{
+	frame code={}
+	center title,
+	left=0pt,
+	right=0pt,
+	top=0pt,
+	bottom=0pt,
+	colback=gray!20,
+	colframe=white,
+	width=\dimexpr\textwidth\relax,
+	enlarge left by=-2mm,
+	boxsep=4pt,
+	arc=0pt,outer arc=0pt,
+}
+
+\urlstyle{same}
+\raggedright
+\setlength{\tabcolsep}{0in}
+
+\titleformat{\section}{
+  \vspace{-4pt}\scshape\raggedright\large
+}{}{0em}{}[\color{black}\titlerule \vspace{-7pt}]
+
+% Custom commands
+\newcommand{\resumeItem}[2]{
+  \item{\textbf{#1}{\hspace{0.5mm}#2 \vspace{-0.5mm}}}
+}
+
+\newcommand{\resumePOR}[3]{
+\vspace{0.5mm}\item
+    \begin{tabular*}{0.97\textwidth}[t]{l@{\extracolsep{\fill}}r}
+        \textbf{#1}\hspace{0.3mm}#2 & \textit{\small{#3}}
+    \end{tabular*}
+    \vspace{-2mm}
+}
+
+\newcommand{\resumeSubheading}[4]{
+\vspace{0.5mm}\item
+    \begin{tabular*}{0.98\textwidth}[t]{l@{\extracolsep{\fill}}r}
+        \textbf{#1} & \textit{\footnotesize{#4}} \\
+        \textit{\footnotesize{#3}} &  \footnotesize{#2}\\
+    \end{tabular*}
+    \vspace{-2.4mm}
+}
+
+\newcommand{\resumeProject}[4]{
+\vspace{0.5mm}\item
+    \begin{tabular*}{0.98\textwidth}[t]{l@{\extracolsep{\fill}}r}
+        \textbf{#1} & \textit{\footnotesize{#3}} \\
+        \footnotesize{\textit{#2}} & \footnotesize{#4}
+    \end{tabular*}
+    \vspace{-2.4mm}
+}
+
+\newcommand{\resumeSubItem}[2]{\resumeItem{#1}{#2}\vspace{-4pt}}
+\renewcommand{\labelitemi}{$\vcenter{\hbox{\tiny$\bullet$}}$}
+
+\newcommand{\resumeSubHeadingListStart}{\begin{itemize}[leftmargin=*,labelsep=0mm]}
+\newcommand{\resumeHeadingSkillStart}{\begin{itemize}[leftmargin=*,itemsep=1.7mm, rightmargin=2ex]}
+\newcommand{\resumeItemListStart}{\begin{justify}\begin{itemize}[leftmargin=3ex, rightmargin=2ex, noitemsep,labelsep=1.2mm,itemsep=0mm]\small}
+\newcommand{\resumeSubHeadingListEnd}{\end{itemize}\vspace{2mm}}
+\newcommand{\resumeHeadingSkillEnd}{\end{itemize}\vspace{-2mm}}
+\newcommand{\resumeItemListEnd}{\end{itemize}\end{justify}\vspace{-2mm}}
+
+\newcommand{\cvsection}[1]{%
+\vspace{2mm}
+\begin{tcolorbox}
+    \textbf{\large #1}
+\end{tcolorbox}
+    \vspace{-4mm}
+}
+
+\newcolumntype{L}{>{\raggedright\arraybackslash}X}%
+\newcolumntype{R}{>{\raggedleft\arraybackslash}X}%
+\newcolumntype{C}{>{\centering\arraybackslash}X}%
+
+"""
+
+DOCUMENT_BODY = r"""\begin{document}
+\fontfamily{cmr}\selectfont
+
+%----------HEADING-----------------
+\parbox{\dimexpr\linewidth\relax}{
+\begin{tabularx}{\linewidth}{L r} \\
+  \textbf{\Large <<name>>} & {\raisebox{0.0\height}{\footnotesize \faPhone}\ +1-<<phone>>}\\
+  {<<location>>} & \href{mailto:<<email>>}{\raisebox{0.0\height}{\footnotesize \faEnvelope}\ {<<email>>}} \\
+  <<course>> & \href{https://github.com/}{\raisebox{0.0\height}{\footnotesize \faGithub}\ {GitHub Profile}} \\
+  {<<university>>} & \href{https://linkedin.com/}{\raisebox{0.0\height}{\footnotesize \faLinkedin}\ {LinkedIn Profile}}
+\end{tabularx}
+}
+
+%-----------EDUCATION-----------
+\section{\textbf{Education}}
+  \resumeSubHeadingListStart
+<<education>>  \resumeSubHeadingListEnd
+\vspace{-5.5mm}
+
+%-----------EXPERIENCE-----------------
+\section{\textbf{Experience}}
+  \resumeSubHeadingListStart
+<<experience>>  \resumeSubHeadingListEnd
+\vspace{-8.5mm}
+
+%-----------PROJECTS-----------------
+\section{\textbf{Personal Projects}}
+\resumeSubHeadingListStart
+<<projects>>\resumeSubHeadingListEnd
+\vspace{-5.5mm}
+
+%-----------Technical skills-----------------
+\section{\textbf{Technical Skills and Interests}}
+ \begin{itemize}[leftmargin=0.05in, label={}]
+    \small{\item{
+     \textbf{Languages}{: <<languages>>} \\
+     \textbf{Developer Tools}{: <<tools>>} \\
+     \textbf{Frameworks}{: <<frameworks>>} \\
+     \textbf{Cloud/Databases}{: <<databases>>} \\
+     \textbf{Soft Skills}{: <<soft_skills>>} \\
+     \textbf{Coursework}{: <<coursework>>} \\
+     \textbf{Areas of Interest}{: <<interests>>} \\
+    }}
+ \end{itemize}
+ \vspace{-16pt}
+
+%-----------Positions of Responsibility-----------------
+\section{\textbf{Positions of Responsibility}}
+\vspace{-0.4mm}
+\resumeSubHeadingListStart
+<<positions>>\resumeSubHeadingListEnd
+\vspace{-5mm}
+
+%-----------Achievements-----------------
+\section{\textbf{Achievements}}
+\vspace{-0.4mm}
+\resumeSubHeadingListStart
+<<achievements>>\resumeSubHeadingListEnd
+\vspace{-5mm}
+\setlength{\footskip}{4.08003pt}
+
+\end{document}
+"""
+
+EDUCATION_ITEM = r"""    \resumeSubheading
+      {<<school>>}{<<score>>}
+      {<<degree>>}{<<year>>}
+"""
+
+EXPERIENCE_ITEM = r"""    \resumeSubheading
+      {<<company>>}{<<city>>}
+      {<<role>>}{<<dates>>}
+      \vspace{-2.0mm}
+      \resumeItemListStart
+<<items>>
+    \resumeItemListEnd
+"""
+
+PROJECT_ITEM = r"""    \resumeProject
+      {<<name>>}{<<description>>}
+      {<<dates>>}
+      {}
+      \resumeItemListStart
+<<items>>
+    \resumeItemListEnd
+    \vspace{-2mm}
+"""
+
+POSITION_ITEM = r"""\resumePOR{<<title>>, }
+    {<<org>>}
+    {<<tenure>>}
+"""
+
+ACHIEVEMENT_ITEM = r"""\resumePOR{<<title>> }
+    {<<desc>>}
+    {<<date>>}
+"""
+
+# Precompiled once at import; fill() takes values in the order the slots appear
+DOCUMENT = compile_template(PREAMBLE + DOCUMENT_BODY)
+EDUCATION = compile_template(EDUCATION_ITEM)
+EXPERIENCE = compile_template(EXPERIENCE_ITEM)
+PROJECT = compile_template(PROJECT_ITEM)
+POSITION = compile_template(POSITION_ITEM)
+ACHIEVEMENT = compile_template(ACHIEVEMENT_ITEM)
+
+
+# ============================================================
+# Rendering
+# ============================================================
+
+def item_lines(items, indent):
+    return "\n".join([f"{indent}\\item {{{escape_latex(item)}}}" for item in items])
+
+
+def generate_latex(data):
+    """Generate LaTeX content from resume data"""
+    skills = data["skills"]
+
+    education = "".join([fill(EDUCATION, (
+        escape_latex(edu["school"]), escape_latex(edu["score"]),
+        escape_latex(edu["degree"]), str(edu["year"]),
+    )) for edu in data["education"]])
+
+    experience = "".join([fill(EXPERIENCE, (
+        escape_latex(exp["company"]), escape_latex(exp["city"]),
+        escape_latex(exp["role"]), str(exp["dates"]),
+        item_lines(exp["items"], "    "),
+    )) for exp in data["experiences"]])
+
+    projects = "".join([fill(PROJECT, (
+        escape_latex(proj["name"]), escape_latex(proj["description"]),
+        str(proj["dates"]),
+        item_lines(proj["items"], "        "),
+    )) for proj in data["projects"]])
+
+    positions = "".join([fill(POSITION, (
+        escape_latex(pos["title"]), escape_latex(pos["org"]), str(pos["tenure"]),
+    )) for pos in data["positions"]])
+
+    achievements = "".join([fill(ACHIEVEMENT, (
+        escape_latex(ach["title"]), escape_latex(ach["desc"]), str(ach["date"]),
+    )) for ach in data["achievements"]])
+
+    email = data["email"]
+    return fill(DOCUMENT, (
+        # Heading
+        escape_latex(data["name"]), data["phone"],
+        escape_latex(data["location"]), email, email,
+        escape_latex(data["course"]),
+        escape_latex(data["university"]),
+        # Sections
+        education, experience, projects,
+        # Technical skills
+        escape_latex(skills["languages"]),
+        escape_latex(skills["tools"]),
+        escape_latex(skills["frameworks"]),
+        escape_latex(skills["databases"]),
+        escape_latex(skills["soft_skills"]),
+        escape_latex(skills["coursework"]),
+        escape_latex(skills["interests"]),
+        positions, achievements,
+    ))
+
+
+def render_many(resumes):
+    """Render a list of resume dicts. Returns a list of LaTeX sources in the same order"""
+    return [generate_latex(data) for data in resumes]
+
+
+# ============================================================
+# Benchmark
+# ============================================================
+
+def check_escaping(samples=20000, seed=0):
+    """
+    Property check for escape_latex. Returns the number of mismatches against
+    - the old replace loop, on characters both handle
+    - a plain str.translate over LATEX_ESCAPES, on every special character
+    """
+    rng = random.Random(seed)
+    shared = "abcXYZ 019.,-/()\u00e9\u4e2d%$&#_{}"
+    full = shared + "~^\\"
+    mismatches = 0
+    for alphabet, reference in [(shared, escape_latex_replace),
+                                (full, lambda t: t.translate(LATEX_ESCAPES))]:
+        for _ in range(samples):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            if escape_latex(text) != reference(text):
+                mismatches += 1
+                print(f"  mismatch: {text!r}")
+    return mismatches
+
+
+def benchmark(rounds=5, fields=20000, seed=0):
+    """Time escape_latex against the old replace loop and a plain str.translate"""
+    rng = random.Random(seed)
+    words = ["Python", "SQL", "R&D", "C#", "100%", "$2M", "data_pipeline", "A/B", "ML", "{team}", "dashboards"]
+    plain_words = ["Python", "SQL", "ML", "Led", "cross-functional", "dashboards", "team"]
+    corpora = [
+        ("plain", [" ".join(rng.choice(plain_words) for _ in range(rng.randint(3, 25))) for _ in range(fields)]),
+        ("special", [" ".join(rng.choice(words) for _ in range(rng.randint(3, 25))) for _ in range(fields)]),
+    ]
+    funcs = [
+        ("replace loop", escape_latex_replace),
+        ("str.translate", lambda t: str(t).translate(LATEX_ESCAPES)),
+        ("escape_latex", escape_latex),
+    ]
+
+    for label, texts in corpora:
+        print(f"  {label} fields:")
+        for name, func in funcs:
+            best = float("inf")
+            for _ in range(rounds):
+                start = time.perf_counter()
+                for text in texts:
+                    func(text)
+                best = min(best, time.perf_counter() - start)
+            print(f"    {name:<14} {best / fields * 1e6:.2f} us/field")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Shared LaTeX resume template')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Check escape_latex against the old replace loop and time both')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print("Escaping property check...")
+        mismatches = check_escaping()
+        print(f"  {mismatches} mismatches")
+        print("Escaping benchmark...")
+        benchmark()
+    else:
+        parser.print_help()
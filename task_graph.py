@@ -0,0 +1,60 @@
+"""
+Small async task-graph executor
+- Each task is an async function that receives the results of its dependencies
+- Independent tasks run concurrently; a task starts as soon as its inputs arrive
+"""
+
+import asyncio
+
+
+class TaskGraph:
+    def __init__(self):
+        self._tasks = {}  # name -> (func, deps)
+
+    def add(self, name, func, deps=()):
+        """
+        Register a task
+
+        Args:
+            name: Unique task name
+            func: Async function called as func(*dep_results)
+            deps: Names of tasks whose results are passed to func, in order
+        """
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        for dep in deps:
+            if dep not in self._tasks:
+                raise ValueError(f"Task {name} depends on unknown task {dep}")
+        self._tasks[name] = (func, tuple(deps))
+        return name
+
+    async def run(self, on_done=None):
+        """
+        Run every task and return {name: result}
+
+        Dependencies must be added before the tasks that use them, so
+        insertion order is already a topological order. on_done(name, result)
+        is called as each task finishes. If a task fails, the remaining
+        tasks are cancelled and the error is raised.
+        """
+        running = {}
+
+        async def run_task(name, func, deps):
+            args = [await running[dep] for dep in deps]
+            result = await func(*args)
+            if on_done is not None:
+                on_done(name, result)
+            return result
+
+        for name, (func, deps) in self._tasks.items():
+            running[name] = asyncio.ensure_future(run_task(name, func, deps))
+
+        try:
+            await asyncio.gather(*running.values())
+        except BaseException:
+            for task in running.values():
+                task.cancel()
+            await asyncio.gather(*running.values(), return_exceptions=True)
+            raise
+
+        return {name: task.result() for name, task in running.items()}